@@ -0,0 +1,489 @@
+from parse import SCORE, GameParser, parse_events
+from live import live_player_rows
+import reference_parse
+from batch_parse import STAT_NAMES, parse_season
+from synthetic import generate_games
+import write_to_sqlite
+import write_to_postgres
+from metrics import get_metrics
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import psycopg2
+from dotenv import load_dotenv
+
+RESULTS_DIR = "./benchmarks"
+
+# parse_events measures about 3x faster than reference_parse.parse_events; the gate leaves room
+# for machine noise and only fails on a real regression
+MIN_PARSE_SPEEDUP = 2.5
+
+# Keys every parser reads from every event, or from every event of the kind that uses them
+EVENT_KEYS = ("Periode", "TofU", "RugNr", "GebStatus", "Text", "Minuut", "RelGUID")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure parsing and writing throughput on synthetic games.")
+    parser.add_argument("--games", type=int, default=500, help="number of synthetic games")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--events-per-period", type=int, default=35)
+    parser.add_argument("--overtime-rate", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=3, help="parse the games this many times and keep the fastest run")
+    parser.add_argument("--postgres", action="store_true", help="also benchmark writing to PostgreSQL")
+    parser.add_argument("--postgres-db", default="vbl_benchmark",
+                        help="scratch database, dropped and recreated on the .env server (never DB_NAME)")
+    parser.add_argument("--batch-size", type=int, default=20, help="games per PostgreSQL commit")
+    parser.add_argument("--sqlite-batch-size", type=int, default=500, help="games per SqliteWriter commit")
+    parser.add_argument("--output", help=f"JSON file for the results, default {RESULTS_DIR}/<commit>.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--min-parse-speedup", type=float, default=MIN_PARSE_SPEEDUP,
+                        help="fail when parse_events is less than this many times faster than the reference parser")
+    return parser.parse_args()
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def timed(run, repeat=1):
+    """
+    Fastest wall-clock time of `repeat` calls of `run`.
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_parse(games, repeat):
+    events = sum(len(raw_events) for _, _, raw_events in games)
+
+    def run():
+        for _, _, raw_events in games:
+            parse_events(raw_events)
+
+    seconds = timed(run, repeat)
+    return {"games": len(games), "events": events, "seconds": seconds, "events_per_second": events / seconds}
+
+
+def bench_reference_parse(games, repeat):
+    events = sum(len(raw_events) for _, _, raw_events in games)
+
+    def run():
+        for _, _, raw_events in games:
+            reference_parse.parse_events(raw_events)
+
+    seconds = timed(run, repeat)
+    return {"games": len(games), "events": events, "seconds": seconds, "events_per_second": events / seconds}
+
+
+def _parse_outcome(parse, raw_events):
+    try:
+        result = parse(raw_events).to_dict()
+    except Exception as e:
+        return type(e).__name__
+    # The reference parser has no stints
+    result.pop("stints", None)
+    return result
+
+
+def malformed_events(rng, raw_events):
+    """
+    Copies of a game's events with one defect each: a missing key, a missing event, a score
+    text that doesn't parse and a minute that isn't a number.
+    """
+    events = [dict(event) for event in raw_events]
+    del events[rng.randrange(len(events))][rng.choice(EVENT_KEYS)]
+    yield events
+
+    events = list(raw_events)
+    del events[rng.randrange(len(events))]
+    yield events
+
+    events = [dict(event) for event in raw_events]
+    scores = [event for event in events if event["GebType"] == SCORE]
+    if scores:
+        rng.choice(scores)["Text"] = "2 (45-"
+    yield events
+
+    events = [dict(event) for event in raw_events]
+    events[rng.randrange(len(events))]["Minuut"] = None
+    yield events
+
+
+def check_parse(games, seed=0):
+    """
+    Parse every game, and malformed copies of it, with parse_events and with the reference
+    parser and return the GUIDs of the games where the statistics or the raised errors differ.
+    """
+    rng = random.Random(seed)
+    differences = []
+    for details, _, raw_events in games:
+        for events in (raw_events, *malformed_events(rng, raw_events)):
+            if _parse_outcome(parse_events, events) != _parse_outcome(reference_parse.parse_events, events):
+                differences.append(details["guid"])
+                break
+    return differences
+
+
+def _live_matches(rng, events):
+    # Apply the events in random slices and compare the rows written so far with parse_events
+    parser = GameParser()
+    written = {}
+    applied = 0
+    while applied < len(events):
+        end = min(len(events), applied + rng.randint(1, 30))
+        try:
+            parser.apply(events[applied:end])
+            if rng.random() < 0.1:
+                parser = GameParser.from_state(json.loads(json.dumps(parser.to_state())))
+            written.update(live_player_rows(parser.snapshot()))
+            live = written
+        except Exception as e:
+            live = type(e).__name__
+        try:
+            expected = live_player_rows(parse_events(events[:end]))
+        except Exception as e:
+            expected = type(e).__name__
+        if live != expected:
+            return False
+        if isinstance(live, str):
+            return True
+        applied = end
+    return True
+
+
+def check_live(games, seed=0):
+    """
+    Feed every game, and malformed copies of it, to a GameParser in random slices, saving and
+    restoring its state now and then, and return the GUIDs of the games where the live rows
+    written from its snapshots differ from those of parse_events on the events so far.
+    """
+    rng = random.Random(seed)
+    differences = []
+    for details, _, raw_events in games:
+        for events in (raw_events, *malformed_events(rng, raw_events)):
+            if not _live_matches(rng, events):
+                differences.append(details["guid"])
+                break
+    return differences
+
+
+def _counters(game_dict):
+    # The part of GameStats.to_dict that parse_season computes
+    def stats(source):
+        return {name: source[name] for name in STAT_NAMES}
+
+    return {
+        team: {
+            "players": {
+                player: {**stats(player_stats), "RelGUID": player_stats["RelGUID"],
+                         "quarters": {quarter: stats(quarter_stats)
+                                      for quarter, quarter_stats in player_stats["quarters"].items()}}
+                for player, player_stats in game_dict[team]["players"].items()
+            },
+            "totalPoints": game_dict[team]["totalPoints"],
+            "quarters": {quarter: stats(quarter_stats) for quarter, quarter_stats in game_dict[team]["quarters"].items()},
+        }
+        for team in ("homeTeam", "awayTeam")
+    }
+
+
+def check_batch_parse(games, seed=0):
+    """
+    Parse all games as one season with parse_season, and then the malformed copies that
+    parse_events accepts as another, and return the GUIDs of the games where its counters
+    differ from those of parse_events.
+    """
+    rng = random.Random(seed)
+    malformed = []
+    for details, _, raw_events in games:
+        for events in malformed_events(rng, raw_events):
+            try:
+                parse_events(events)
+            except Exception:
+                continue
+            malformed.append((details["guid"], events))
+            break
+
+    differences = []
+    for season_games in ([(details["guid"], raw_events) for details, _, raw_events in games], malformed):
+        season = parse_season(season_games).to_game_dicts()
+        for guid, events in season_games:
+            if season[guid] != _counters(parse_events(events).to_dict()):
+                differences.append(guid)
+    return differences
+
+
+def bench_batch_parse(games, repeat):
+    events = sum(len(raw_events) for _, _, raw_events in games)
+    season_games = [(details["guid"], raw_events) for details, _, raw_events in games]
+    seconds = timed(lambda: parse_season(season_games), repeat)
+    return {"games": len(games), "events": events, "seconds": seconds, "events_per_second": events / seconds}
+
+
+def bench_sqlite(games):
+    directory = tempfile.mkdtemp(prefix="vbl_benchmark_")
+    db_path = os.path.join(directory, "benchmark.sqlite")
+    try:
+        write_to_sqlite.initialize_database(db_path)
+        parsed = [(players, parse_events(raw_events), details) for details, players, raw_events in games]
+
+        def run():
+            for players, game_stats, details in parsed:
+                write_to_sqlite.write_to_sqlite(players, game_stats, details, db_path)
+
+        seconds = timed(run)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return {"games": len(games), "seconds": seconds, "games_per_second": len(games) / seconds}
+
+
+def bench_sqlite_batch(games, batch_size):
+    directory = tempfile.mkdtemp(prefix="vbl_benchmark_")
+    db_path = os.path.join(directory, "benchmark.sqlite")
+    try:
+        parsed = [(players, parse_events(raw_events), details) for details, players, raw_events in games]
+        writer = write_to_sqlite.SqliteWriter(db_path, batch_size=batch_size)
+
+        def run():
+            for players, game_stats, details in parsed:
+                writer.write(players, game_stats, details)
+            writer.flush()
+
+        try:
+            seconds = timed(run)
+        finally:
+            writer.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return {"games": len(games), "batch_size": batch_size, "seconds": seconds, "games_per_second": len(games) / seconds}
+
+
+def _copy_game(game, suffix):
+    details, players, raw_events = game
+    return dict(details, guid=f"{details['guid']}-{suffix}"), players, raw_events
+
+
+def check_postgres_writer(games, db_config):
+    """
+    Make two PostgresWriter threads deadlock and write a game that fails inside a batch, and
+    return what went wrong. Each thread writes a copy of one game and then, while its batch
+    still holds that game's Players and Standings locks, a copy of the game the other thread
+    wrote first, so the database has to pick a loser that is retried. The failing game must
+    be rolled back to its savepoint without taking the other games of its batch with it.
+    """
+    problems = []
+    metrics = get_metrics()
+    deadlock_key = ("db_deadlocks_total", (("writer", "postgres"),))
+    deadlocks_before = metrics.values.get(deadlock_key, 0)
+
+    # Two games without a team in common, so neither thread waits for the other's first game
+    first = games[0]
+    teams = {first[0]["teamThuisGUID"], first[0]["teamUitGUID"]}
+    second = next((game for game in games[1:] if not teams & {game[0]["teamThuisGUID"], game[0]["teamUitGUID"]}), None)
+    if second is None:
+        return ["no two games without a team in common"]
+    orders = ([_copy_game(first, "a"), _copy_game(second, "b")], [_copy_game(second, "a"), _copy_game(first, "b")])
+    writer = write_to_postgres.PostgresWriter(db_config, batch_size=2, pool_size=3)
+    barrier = threading.Barrier(2)
+    errors = []
+
+    def write(order):
+        try:
+            for index, (details, players, raw_events) in enumerate(order):
+                if index == 1:
+                    barrier.wait(timeout=60)
+                writer.write(players, parse_events(raw_events), details, raw_events=raw_events)
+            # Commit what the retried game left in this thread's batch before the next check
+            writer.flush()
+        except Exception as e:
+            errors.append(e)
+            barrier.abort()
+
+    threads = [threading.Thread(target=write, args=(order,)) for order in orders]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    written = [details["guid"] for order in orders for details, _, _ in order]
+    if errors:
+        problems.append(f"deadlocked writers raised {errors[0]!r}")
+    if metrics.values.get(deadlock_key, 0) == deadlocks_before:
+        problems.append("the two writers didn't deadlock")
+
+    # The middle game fails after its Games row was inserted
+    good_before, good_after = _copy_game(first, "c"), _copy_game(second, "c")
+    failing_details, _, failing_events = _copy_game(first, "d")
+    writer.batch_size = 3
+    writer.write(good_before[1], parse_events(good_before[2]), good_before[0], raw_events=good_before[2])
+    try:
+        writer.write({"TtDeel": []}, parse_events(failing_events), failing_details, raw_events=failing_events)
+        problems.append("the game without a roster was written")
+    except KeyError:
+        pass
+    writer.write(good_after[1], parse_events(good_after[2]), good_after[0], raw_events=good_after[2])
+    writer.close()
+    written += [good_before[0]["guid"], good_after[0]["guid"]]
+
+    conn = psycopg2.connect(**db_config)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT game_guid FROM Games WHERE game_guid = ANY(%s)", (written + [failing_details["guid"]],))
+            stored = {row[0] for row in cursor.fetchall()}
+    finally:
+        conn.close()
+    missing = [guid for guid in written if guid not in stored]
+    if missing:
+        problems.append(f"games not committed: {', '.join(missing)}")
+    if failing_details["guid"] in stored:
+        problems.append("the failing game was committed")
+    return problems
+
+
+def recreate_database(db_config, name):
+    """
+    Drop and create the scratch database `name` on the server of `db_config`.
+    """
+    if name == db_config.get("dbname"):
+        raise ValueError(f"Refusing to drop {name}, it is the configured DB_NAME")
+    conn = psycopg2.connect(**dict(db_config, dbname="postgres"))
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f'DROP DATABASE IF EXISTS "{name}"')
+            cursor.execute(f'CREATE DATABASE "{name}"')
+    finally:
+        conn.close()
+    return dict(db_config, dbname=name)
+
+
+def bench_postgres(games, db_config, batch_size):
+    write_to_postgres.initialize_database(db_config)
+    parsed = [(players, parse_events(raw_events), details, raw_events) for details, players, raw_events in games]
+    writer = write_to_postgres.PostgresWriter(db_config, batch_size=batch_size, pool_size=1)
+    events = sum(len(raw_events) for _, _, raw_events in games)
+
+    def run():
+        for players, game_stats, details, raw_events in parsed:
+            writer.write(players, game_stats, details, raw_events=raw_events)
+        writer.flush()
+
+    try:
+        seconds = timed(run)
+    finally:
+        writer.close()
+    return {"games": len(games), "events": events, "batch_size": batch_size, "seconds": seconds,
+            "games_per_second": len(games) / seconds}
+
+
+def compare(results, previous):
+    """
+    Print the change of every throughput against an earlier results file.
+    """
+    print(f"Compared to {previous.get('commit')} ({previous.get('created')}):")
+    for name, result in results["results"].items():
+        earlier = previous.get("results", {}).get(name)
+        for metric in ("events_per_second", "games_per_second"):
+            if metric in result and earlier and earlier.get(metric):
+                change = (result[metric] / earlier[metric] - 1) * 100
+                print(f"  {name} {metric}: {earlier[metric]:.0f} -> {result[metric]:.0f} ({change:+.1f}%)")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    load_dotenv()
+
+    print(f"Generating {args.games} games")
+    games = list(generate_games(args.games, seed=args.seed, events_per_period=args.events_per_period,
+                                overtime_rate=args.overtime_rate))
+
+    commit = current_commit()
+    results = {
+        "commit": commit,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "parameters": {
+            "games": args.games, "seed": args.seed, "events_per_period": args.events_per_period,
+            "overtime_rate": args.overtime_rate, "repeat": args.repeat,
+        },
+        "results": {},
+    }
+
+    differences = check_parse(games, args.seed)
+    if differences:
+        print(f"parse_events differs from the reference parser on {len(differences)} games, e.g. {differences[0]}")
+        sys.exit(1)
+    print(f"parse_events matches the reference parser on {len(games)} games and their malformed copies")
+    differences = check_live(games, args.seed)
+    if differences:
+        print(f"GameParser snapshots differ from parse_events on {len(differences)} games, e.g. {differences[0]}")
+        sys.exit(1)
+    print(f"GameParser snapshots match parse_events on {len(games)} games and their malformed copies")
+
+    results["results"]["parse"] = bench_parse(games, args.repeat)
+    print(f"parse_events: {results['results']['parse']['events_per_second']:.0f} events/s")
+    results["results"]["reference_parse"] = bench_reference_parse(games, args.repeat)
+    speedup = results["results"]["parse"]["events_per_second"] / results["results"]["reference_parse"]["events_per_second"]
+    results["results"]["parse"]["speedup"] = speedup
+    print(f"reference parse_events: {results['results']['reference_parse']['events_per_second']:.0f} events/s"
+          f" ({speedup:.2f}x slower)")
+    differences = check_batch_parse(games, args.seed)
+    if differences:
+        print(f"parse_season differs from parse_events on {len(differences)} games, e.g. {differences[0]}")
+        sys.exit(1)
+    print(f"parse_season matches parse_events on {len(games)} games and malformed copies")
+    results["results"]["batch_parse"] = bench_batch_parse(games, args.repeat)
+    print(f"batch_parse: {results['results']['batch_parse']['events_per_second']:.0f} events/s")
+    results["results"]["sqlite"] = bench_sqlite(games)
+    print(f"write_to_sqlite: {results['results']['sqlite']['games_per_second']:.1f} games/s")
+    results["results"]["sqlite_batch"] = bench_sqlite_batch(games, args.sqlite_batch_size)
+    print(f"SqliteWriter: {results['results']['sqlite_batch']['games_per_second']:.1f} games/s")
+
+    if args.postgres:
+        db_config = {
+            "dbname": os.getenv("DB_NAME"),
+            "user": os.getenv("DB_USER"),
+            "password": os.getenv("DB_PASSWORD"),
+            "host": os.getenv("DB_HOST"),
+            "port": os.getenv("DB_PORT")
+        }
+        benchmark_config = recreate_database(db_config, args.postgres_db)
+        results["results"]["postgres"] = bench_postgres(games, benchmark_config, args.batch_size)
+        print(f"write_to_postgres: {results['results']['postgres']['games_per_second']:.1f} games/s")
+        problems = check_postgres_writer(games, benchmark_config)
+        if problems:
+            print(f"PostgresWriter: {'; '.join(problems)}")
+            sys.exit(1)
+        print("PostgresWriter retried the deadlocked game and rolled back the failing game alone")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+
+    if speedup < args.min_parse_speedup:
+        print(f"parse_events is only {speedup:.2f}x faster than the reference parser, expected {args.min_parse_speedup}x")
+        sys.exit(1)
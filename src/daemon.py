@@ -0,0 +1,126 @@
+from write_to_postgres import PostgresWriter
+from response_cache import get_cache
+from ledger import get_ledger
+from step_two import get_todays_played_game_guids, persist_region_states, process_games
+from live import LiveGames
+from metrics import get_metrics
+from vbl_client import fetch_game_details, fetch_game_events
+import argparse
+import datetime
+import os
+import signal
+import threading
+import time
+from dotenv import load_dotenv
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Keep polling for played games and insert them into the database.")
+    parser.add_argument("--min-interval", type=int, default=60, help="seconds between polls while results are expected")
+    parser.add_argument("--max-interval", type=int, default=1800, help="longest wait between two polls")
+    parser.add_argument("--result-after", type=int, default=90, help="minutes after beginTijd a result can first be expected")
+    parser.add_argument("--result-window", type=int, default=90, help="minutes after that to keep polling at --min-interval")
+    parser.add_argument("--live", action="store_true", help="also write provisional stats of games in progress every --min-interval")
+    return parser.parse_args()
+
+
+class PollSchedule:
+    """
+    Decides when to poll next from the start times of the games without a result.
+
+    While a game is in its result window (beginTijd + `result_after`, for `result_window`)
+    we poll every `min_interval` seconds, otherwise we sleep until the next window opens,
+    at most `max_interval` seconds. With `live` the window opens at beginTijd.
+    """
+    def __init__(self, min_interval, max_interval, result_after, result_window, live=False):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.result_after = datetime.timedelta(minutes=result_after)
+        self.result_window = datetime.timedelta(minutes=result_window)
+        self.live = live
+        self.games = {}
+
+    def update(self, upcoming):
+        """
+        Replace the unfinished (guid, start time) games of the given regions.
+        """
+        self.games.update(upcoming)
+
+    def in_progress(self, now):
+        """
+        GUIDs of the games that started and whose result window has not closed yet.
+        """
+        end = self.result_after + self.result_window
+        return [guid for games in self.games.values() for guid, start in games if start <= now <= start + end]
+
+    def next_delay(self, now):
+        next_window = None
+        for games in self.games.values():
+            for _, start in games:
+                opens = start if self.live else start + self.result_after
+                if opens <= now <= start + self.result_after + self.result_window:
+                    return self.min_interval
+                if opens > now and (next_window is None or opens < next_window):
+                    next_window = opens
+
+        if next_window is None:
+            return self.max_interval
+        delay = (next_window - now).total_seconds()
+        return max(self.min_interval, min(self.max_interval, delay))
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    load_dotenv()
+
+    db_config = {
+        "dbname": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "host": os.getenv("DB_HOST"),
+        "port": os.getenv("DB_PORT")
+    }
+
+    # Finish the game being written, then stop
+    stopping = threading.Event()
+    for signal_number in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signal_number, lambda signum, frame: stopping.set())
+
+    cache = get_cache()
+    ledger = get_ledger()
+    writer = PostgresWriter(db_config, pool_size=1)
+    schedule = PollSchedule(args.min_interval, args.max_interval, args.result_after, args.result_window, args.live)
+    live_games = LiveGames(writer, ledger)
+
+    try:
+        while not stopping.is_set():
+            try:
+                guids, region_states, upcoming = get_todays_played_game_guids(ledger)
+                if process_games(guids, writer, ledger, cache, stopping):
+                    persist_region_states(ledger, region_states)
+                schedule.update(upcoming)
+                get_metrics().set("ingest_last_poll_timestamp_seconds", time.time())
+            except Exception as e:
+                print(f"Poll failed: {e}")
+                get_metrics().error("poll", e)
+
+            if args.live:
+                in_progress = schedule.in_progress(datetime.datetime.now())
+                live_games.retain(in_progress)
+                for guid in in_progress:
+                    if stopping.is_set():
+                        break
+                    try:
+                        written = live_games.update(guid, fetch_game_details(guid), fetch_game_events(guid))
+                        print(f"Live game {guid}: {written} players updated")
+                    except Exception as e:
+                        print(f"Error updating live game {guid}: {e}")
+
+            delay = schedule.next_delay(datetime.datetime.now())
+            print(f"Next poll in {delay:.0f}s")
+            stopping.wait(delay)
+    finally:
+        live_games.close()
+        writer.close()
+        ledger.close()
+        print("Stopped")
@@ -0,0 +1,214 @@
+from synthetic import generate_games
+from step_two import REGIONS
+from response_cache import ResponseCache
+from vbl_client import TokenBucket
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from collections import Counter
+import argparse
+import datetime
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve generated or cached games as a local stand-in for the VBL web service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8321)
+    parser.add_argument("--games", type=int, default=500, help="number of synthetic games to serve")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", help="serve the games of this response cache directory instead of synthetic ones")
+    parser.add_argument("--end-today", action="store_true",
+                        help="shift the game dates so the last round is played today, for step_two and the daemon")
+    parser.add_argument("--latency", type=float, default=50, help="milliseconds added to every response")
+    parser.add_argument("--jitter", type=float, default=20, help="up to this many milliseconds added at random")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="fraction of requests whose connection is closed without an answer")
+    parser.add_argument("--rate", type=float, default=0, help="requests per second before answering 429, 0 for no limit")
+    parser.add_argument("--burst", type=int, default=20)
+    return parser.parse_args()
+
+
+class FakeVbl:
+    """
+    Pre-encoded payloads of the four endpoints the ingestion uses, keyed by game GUID, plus
+    a MatchesByRegioPeriode listing per region.
+    """
+    def __init__(self, games, regions=REGIONS):
+        self.details = {}
+        self.players = {}
+        self.events = {}
+        self.listings = {region: [] for region in regions}
+
+        for game_details, game_players, raw_events in games:
+            guid = game_details["guid"]
+            self.details[guid] = self._encode([{"doc": game_details}])
+            self.players[guid] = self._encode(game_players)
+            self.events[guid] = self._encode({"GebNis": raw_events})
+
+            # Games of a poule are listed in the same region
+            poule = game_details.get("pouleGUID") or guid
+            region = regions[int(hashlib.sha256(poule.encode()).hexdigest(), 16) % len(regions)]
+            self.listings[region].append((self._start_millis(game_details), game_details))
+
+    @staticmethod
+    def _encode(payload):
+        body = json.dumps(payload).encode()
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        return body, gzip.compress(body, compresslevel=5), etag
+
+    @staticmethod
+    def _start_millis(game_details):
+        try:
+            start = datetime.datetime.strptime(
+                f"{game_details['datumString']} {game_details.get('beginTijd', '00.00').replace('.', ':')}",
+                "%d-%m-%Y %H:%M",
+            )
+        except (KeyError, ValueError):
+            return 0
+        return int(start.timestamp() * 1000)
+
+    def listing(self, region, dt_start, dt_end):
+        matches = [game for start, game in self.listings.get(region, []) if dt_start <= start < dt_end]
+        return self._encode(matches)
+
+
+def shift_to_today(games):
+    """
+    Move the dates of `games` so the latest one falls on today.
+    """
+    dates = [datetime.datetime.strptime(details["datumString"], "%d-%m-%Y").date() for details, _, _ in games]
+    shift = datetime.date.today() - max(dates)
+    for (details, _, _), date in zip(games, dates):
+        details["datumString"] = f"{date + shift:%d-%m-%Y}"
+
+
+def make_handler(fake, args, stats):
+    limiter = TokenBucket(args.rate, args.burst) if args.rate > 0 else None
+    stats_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *log_args):
+            pass
+
+        def _count(self, endpoint, status):
+            with stats_lock:
+                stats[(endpoint, status)] += 1
+
+        def _respond(self, endpoint, payload):
+            time.sleep((args.latency + random.uniform(0, args.jitter)) / 1000)
+
+            if limiter is not None and not limiter.try_acquire():
+                self._count(endpoint, 429)
+                self._send(429, b"Too Many Requests", headers={"Retry-After": "1"})
+                return
+            roll = random.random()
+            if roll < args.drop_rate:
+                self._count(endpoint, "dropped")
+                self.close_connection = True
+                return
+            if roll < args.drop_rate + args.error_rate:
+                self._count(endpoint, 503)
+                self._send(503, b"Service Unavailable")
+                return
+            if payload is None:
+                self._count(endpoint, 404)
+                self._send(404, b"Not Found")
+                return
+
+            body, compressed, etag = payload
+            if self.headers.get("If-None-Match") == etag:
+                self._count(endpoint, 304)
+                self._send(304, b"", headers={"ETag": etag})
+                return
+
+            headers = {"Content-Type": "application/json; charset=utf-8", "ETag": etag}
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = compressed
+                headers["Content-Encoding"] = "gzip"
+            self._count(endpoint, 200)
+            self._send(200, body, headers)
+
+        def _send(self, status, body, headers=None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_guid(self):
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                return json.loads(self.rfile.read(length) or b"{}").get("WedGUID")
+            except ValueError:
+                return None
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            endpoint = url.path.rstrip("/").rsplit("/", 1)[-1]
+            query = {name: values[0] for name, values in parse_qs(url.query).items()}
+
+            if endpoint == "MatchByWedGuid":
+                self._respond(endpoint, fake.details.get(query.get("issguid")))
+            elif endpoint == "MatchesByRegioPeriode":
+                try:
+                    dt_start = int(query.get("dtStart", 0))
+                    dt_end = int(query.get("dtEnd", 999999999999999999))
+                except ValueError:
+                    self._send(400, b"Bad Request")
+                    return
+                self._respond(endpoint, fake.listing(query.get("curRegio"), dt_start, dt_end))
+            else:
+                self._respond(endpoint, None)
+
+        def do_PUT(self):
+            endpoint = urlsplit(self.path).path.rstrip("/").rsplit("/", 1)[-1]
+            guid = self._read_guid()
+
+            if endpoint == "DwfDeelByWedGuid":
+                self._respond(endpoint, fake.players.get(guid))
+            elif endpoint == "DwfVgngByWedGuid":
+                self._respond(endpoint, fake.events.get(guid))
+            else:
+                self._respond(endpoint, None)
+
+    return Handler
+
+
+def load_games(args):
+    if args.cache:
+        cache = ResponseCache(args.cache)
+        games = [game for game in map(cache.get_game, cache.game_guids()) if game is not None]
+        cache.close()
+    else:
+        games = list(generate_games(args.games, seed=args.seed))
+    if args.end_today and games:
+        shift_to_today(games)
+    return games
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    games = load_games(args)
+    fake = FakeVbl(games)
+    stats = Counter()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(fake, args, stats))
+    server.daemon_threads = True
+
+    print(f"Serving {len(games)} games on http://{args.host}:{args.port}, set VBL_BASE_URL to this address")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for (endpoint, status), count in sorted(stats.items(), key=str):
+            print(f"{endpoint} {status}: {count}")
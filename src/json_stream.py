@@ -0,0 +1,49 @@
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_SKIPPED = " \t\r\n,"
+
+
+def iter_json_array(chunks):
+    """
+    Yield the items of a top-level JSON array from an iterable of byte chunks.
+
+    Only the undecoded tail of the body and the item being decoded are held in memory,
+    so peak memory depends on the largest item rather than on the size of the array.
+    """
+    text = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    position = 0
+    started = False
+
+    for chunk in chunks:
+        buffer = buffer[position:] + text.decode(chunk)
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in _SKIPPED:
+                position += 1
+            if position == len(buffer):
+                break
+
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError(f"Expected a JSON array, got {buffer[position]!r}")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+
+            try:
+                item, end = _decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The item continues in the next chunk
+                break
+            if end == len(buffer) and not isinstance(item, (dict, list)):
+                # A number or literal at the end of the buffer may still be incomplete
+                break
+            yield item
+            position = end
+
+    raise ValueError("JSON array is truncated or malformed")
@@ -0,0 +1,312 @@
+import datetime
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+LEDGER_PATH = "./src/ledger.sqlite"
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+DEAD = "dead"
+
+# A failed game is retried after RETRY_BACKOFF seconds, doubling after every further
+# failure, until it has failed MAX_ATTEMPTS times and is left in the dead-letter state
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF = 300
+
+
+class GameLedger:
+    """
+    Local SQLite ledger of the games we have seen, with their processing status,
+    attempt count, last error and timestamps. It doubles as the checkpoint journal
+    of a backfill and as the dead-letter store of games that keep failing.
+    """
+    def __init__(self, path=LEDGER_PATH, max_attempts=MAX_ATTEMPTS, retry_backoff=RETRY_BACKOFF):
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS processed_games (
+                guid TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                failures INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                error_class TEXT,
+                next_attempt_at REAL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS processed_games_status ON processed_games (status);
+            CREATE TABLE IF NOT EXISTS region_watermarks (
+                region TEXT PRIMARY KEY,
+                watermark INTEGER NOT NULL,
+                etag TEXT,
+                payload_hash TEXT,
+                upcoming TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS live_games (
+                guid TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+        """)
+        # Ledgers created before failed games were retried lack the retry columns
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(processed_games)")}
+        for column, column_type in (("error_class", "TEXT"), ("next_attempt_at", "REAL")):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE processed_games ADD COLUMN {column} {column_type}")
+        # and ones from before attempts and failures were counted apart lack the failure count
+        if "failures" not in columns:
+            self.conn.execute("ALTER TABLE processed_games ADD COLUMN failures INTEGER NOT NULL DEFAULT 0")
+            self.conn.execute("UPDATE processed_games SET failures = attempts WHERE status IN (?, ?)", (FAILED, DEAD))
+        # and older ones the start times of the unfinished games of a region
+        if "upcoming" not in {row[1] for row in self.conn.execute("PRAGMA table_info(region_watermarks)")}:
+            self.conn.execute("ALTER TABLE region_watermarks ADD COLUMN upcoming TEXT")
+        self.conn.commit()
+
+    def _with_guids(self, guids, query, params=()):
+        """
+        Load `guids` into a temporary table and run `query` joined against it, so
+        membership tests take one statement regardless of how many GUIDs we ask about.
+        """
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS lookup (guid TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM lookup")
+        self.conn.executemany("INSERT OR IGNORE INTO lookup (guid) VALUES (?)", ((guid,) for guid in guids))
+        rows = self.conn.execute(query, params).fetchall()
+        self.conn.execute("DELETE FROM lookup")
+        # End the transaction the temp table opened, or it keeps a read lock on the ledger
+        # and other processes can't write to it
+        self.conn.commit()
+        return rows
+
+    def with_status(self, guids, status=DONE):
+        """
+        Return the subset of `guids` that have the given status.
+        """
+        with self._lock:
+            rows = self._with_guids(guids, """
+                SELECT l.guid FROM lookup l
+                JOIN processed_games p ON p.guid = l.guid
+                WHERE p.status = ?
+            """, (status,))
+        return {row[0] for row in rows}
+
+    def runnable(self, guids, now=None):
+        """
+        Return the subset of `guids` worth processing now: unknown and pending games,
+        and failed games whose backoff has passed. Done and dead games are skipped.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._with_guids(guids, """
+                SELECT l.guid FROM lookup l
+                LEFT JOIN processed_games p ON p.guid = l.guid
+                WHERE p.guid IS NULL
+                   OR p.status = ?
+                   OR (p.status = ? AND COALESCE(p.next_attempt_at, 0) <= ?)
+            """, (PENDING, FAILED, now))
+        return {row[0] for row in rows}
+
+    def add_pending(self, guids):
+        """
+        Register new GUIDs as pending. GUIDs already in the ledger keep their status.
+        """
+        now = time.time()
+        with self._lock:
+            self.conn.executemany("""
+                INSERT INTO processed_games (guid, status, created_at, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (guid) DO NOTHING
+            """, ((guid, PENDING, now, now) for guid in guids))
+            self.conn.commit()
+
+    def mark_done(self, guid):
+        now = time.time()
+        with self._lock:
+            self.conn.execute("""
+                INSERT INTO processed_games (guid, status, attempts, created_at, updated_at)
+                VALUES (?, ?, 1, ?, ?)
+                ON CONFLICT (guid) DO UPDATE SET
+                    status = excluded.status,
+                    attempts = processed_games.attempts + 1,
+                    failures = 0,
+                    last_error = NULL,
+                    error_class = NULL,
+                    next_attempt_at = NULL,
+                    updated_at = excluded.updated_at
+            """, (guid, DONE, now, now))
+            # A finished game has no live state anymore
+            self.conn.execute("DELETE FROM live_games WHERE guid = ?", (guid,))
+            self.conn.commit()
+
+    def mark_failed(self, guid, error):
+        """
+        Record a failed attempt and schedule the next one with exponential backoff.
+        After `max_attempts` failures in a row the game is dead-lettered. Returns the new status.
+        """
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT attempts, failures FROM processed_games WHERE guid = ?", (guid,)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            failures = (row[1] if row else 0) + 1
+            status = DEAD if failures >= self.max_attempts else FAILED
+            next_attempt_at = None if status == DEAD else now + self.retry_backoff * 2 ** (failures - 1)
+            self.conn.execute("""
+                INSERT INTO processed_games (
+                    guid, status, attempts, failures, last_error, error_class, next_attempt_at, created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (guid) DO UPDATE SET
+                    status = excluded.status,
+                    attempts = excluded.attempts,
+                    failures = excluded.failures,
+                    last_error = excluded.last_error,
+                    error_class = excluded.error_class,
+                    next_attempt_at = excluded.next_attempt_at,
+                    updated_at = excluded.updated_at
+            """, (guid, status, attempts, failures, str(error), type(error).__name__, next_attempt_at, now, now))
+            self.conn.commit()
+        return status
+
+    def due_for_retry(self, now=None):
+        """
+        Failed GUIDs whose backoff has passed, oldest first.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self.conn.execute("""
+                SELECT guid FROM processed_games
+                WHERE status = ? AND COALESCE(next_attempt_at, 0) <= ?
+                ORDER BY created_at, guid
+            """, (FAILED, now)).fetchall()
+        return [row[0] for row in rows]
+
+    def dead_letters(self):
+        """
+        (guid, attempts, error_class, last_error, updated_at) of every dead-lettered game.
+        """
+        with self._lock:
+            return self.conn.execute("""
+                SELECT guid, attempts, error_class, last_error, updated_at FROM processed_games
+                WHERE status = ? ORDER BY updated_at
+            """, (DEAD,)).fetchall()
+
+    def revive(self, guids):
+        """
+        Give dead-lettered games a fresh set of attempts.
+        """
+        now = time.time()
+        with self._lock:
+            self.conn.executemany("""
+                UPDATE processed_games SET status = ?, failures = 0, next_attempt_at = NULL, updated_at = ?
+                WHERE guid = ? AND status = ?
+            """, ((PENDING, now, guid, DEAD) for guid in guids))
+            self.conn.commit()
+
+    def unfinished(self):
+        """
+        GUIDs that are pending or failed, oldest first.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT guid FROM processed_games WHERE status IN (?, ?) ORDER BY created_at, guid",
+                (PENDING, FAILED),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def region_state(self, region):
+        """
+        Return the persisted watermark, ETag, payload hash and (guid, start time) of the
+        unfinished games of a region, or None. The games are None when they weren't saved.
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT watermark, etag, payload_hash, upcoming FROM region_watermarks WHERE region = ?", (region,)
+            ).fetchone()
+        if row is None:
+            return None
+        upcoming = None
+        if row[3] is not None:
+            upcoming = [(guid, datetime.datetime.fromisoformat(start)) for guid, start in json.loads(row[3])]
+        return {"watermark": row[0], "etag": row[1], "payload_hash": row[2], "upcoming": upcoming}
+
+    def set_region_state(self, region, watermark, etag, payload_hash, upcoming=None):
+        if upcoming is not None:
+            upcoming = json.dumps([(guid, start.isoformat()) for guid, start in upcoming])
+        with self._lock:
+            self.conn.execute("""
+                INSERT INTO region_watermarks (region, watermark, etag, payload_hash, upcoming, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (region) DO UPDATE SET
+                    watermark = excluded.watermark,
+                    etag = excluded.etag,
+                    payload_hash = excluded.payload_hash,
+                    upcoming = excluded.upcoming,
+                    updated_at = excluded.updated_at
+            """, (region, watermark, etag, payload_hash, upcoming, time.time()))
+            self.conn.commit()
+
+    def live_state(self, guid):
+        """
+        Return the saved live-parser state of a game in progress, or None.
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT state FROM live_games WHERE guid = ?", (guid,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_live_state(self, guid, state):
+        with self._lock:
+            self.conn.execute("""
+                INSERT INTO live_games (guid, state, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT (guid) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at
+            """, (guid, json.dumps(state), time.time()))
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def get_ledger():
+    """
+    Open the ledger configured through LEDGER_PATH, LEDGER_MAX_ATTEMPTS and LEDGER_RETRY_BACKOFF.
+    """
+    return GameLedger(
+        os.getenv("LEDGER_PATH", LEDGER_PATH),
+        max_attempts=int(os.getenv("LEDGER_MAX_ATTEMPTS", MAX_ATTEMPTS)),
+        retry_backoff=float(os.getenv("LEDGER_RETRY_BACKOFF", RETRY_BACKOFF)),
+    )
+
+
+if __name__ == "__main__":
+    ledger = get_ledger()
+
+    # Inspect and revive dead-lettered games: python3 src/ledger.py dead / revive-dead
+    if sys.argv[1:] == ["dead"]:
+        for guid, attempts, error_class, last_error, updated_at in ledger.dead_letters():
+            print(f"{guid}\t{attempts} attempts\t{error_class}: {last_error}")
+        sys.exit(0)
+    if sys.argv[1:] == ["revive-dead"]:
+        guids = [row[0] for row in ledger.dead_letters()]
+        ledger.revive(guids)
+        print(f"{len(guids)} dead-lettered games queued again")
+        sys.exit(0)
+
+    # Seed the ledger from the old text files: python3 src/ledger.py mark-done ./src/played_games.txt
+    if len(sys.argv) != 3 or sys.argv[1] not in ("add-pending", "mark-done"):
+        print("usage: ledger.py add-pending|mark-done FILE | dead | revive-dead")
+        sys.exit(1)
+
+    with open(sys.argv[2], "r") as file:
+        guids = [line.strip() for line in file if line.strip()]
+
+    ledger.add_pending(guids)
+    if sys.argv[1] == "mark-done":
+        for guid in guids:
+            ledger.mark_done(guid)
+    print(f"{len(guids)} games added to the ledger")
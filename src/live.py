@@ -0,0 +1,107 @@
+from parse import GameParser
+import time
+
+# Seconds between two saves of the live state of a game to the ledger
+SAVE_INTERVAL = 300
+
+
+def live_player_rows(game_stats):
+    """
+    LivePlayerGames rows of a game in progress, keyed by player GUID.
+    """
+    rows = {}
+    for team_guid, team_stats in ((game_stats.teamThuisGUID, game_stats.homeTeam),
+                                  (game_stats.teamUitGUID, game_stats.awayTeam)):
+        for player_stats in team_stats.players.values():
+            rows[player_stats.RelGUID] = [
+                player_stats.RelGUID, game_stats.guid, team_guid,
+                player_stats.totalPoints, player_stats.onePointers, player_stats.twoPointers,
+                player_stats.threePointers, player_stats.fouls, player_stats.totalMinutesPlayed,
+                player_stats.plusMinus,
+            ]
+    return rows
+
+
+class LiveGames:
+    """
+    The parsers of the games in progress, kept in memory between polls, with the
+    LivePlayerGames rows last written for each. The ledger keeps a copy of both so a restarted
+    daemon can go on where it stopped; it is saved when rows were written, at most every
+    `save_interval` seconds per game, and by `close`.
+    """
+    def __init__(self, writer, ledger, save_interval=SAVE_INTERVAL):
+        self.writer = writer
+        self.ledger = ledger
+        self.save_interval = save_interval
+        self.games = {}  # guid -> [parser, rows written, time the ledger copy was saved or None, unsaved]
+
+    def _restore(self, guid):
+        state = self.ledger.live_state(guid)
+        if state:
+            try:
+                return [GameParser.from_state(state["parser"]), state["written"], time.monotonic(), False]
+            except (KeyError, TypeError, ValueError) as e:
+                # e.g. the state of an older version of the parser
+                print(f"Saved live state of game {guid} is unusable ({e!r}), parsing the game again")
+        return [GameParser(), {}, None, False]
+
+    def update(self, guid, game_details, raw_events):
+        """
+        Apply the events of a game in progress that arrived since the previous poll and write
+        the LivePlayerGames rows that changed. Returns the number of rows written.
+        """
+        game = self.games.get(guid)
+        if game is None:
+            game = self.games[guid] = self._restore(guid)
+        parser, written, saved, _ = game
+
+        new_events = parser.new_events(raw_events)
+        if new_events is None:
+            # An event we already applied was changed or removed
+            parser = game[0] = GameParser()
+            new_events = raw_events
+        if not new_events:
+            return 0
+        try:
+            parser.apply(new_events)
+        except Exception:
+            # The parser is left half-way through an event
+            del self.games[guid]
+            raise
+
+        game_stats = parser.snapshot()
+        game_stats.guid = guid
+        game_stats.teamThuisGUID = game_details["teamThuisGUID"]
+        game_stats.teamUitGUID = game_details["teamUitGUID"]
+
+        changed = [row for player_guid, row in live_player_rows(game_stats).items() if written.get(player_guid) != row]
+        if changed:
+            self.writer.write_live(changed)
+            for row in changed:
+                written[row[0]] = row
+            game[3] = True
+            if saved is None or time.monotonic() - saved >= self.save_interval:
+                self._save(guid, game)
+        return len(changed)
+
+    def _save(self, guid, game):
+        parser, written, _, _ = game
+        self.ledger.set_live_state(guid, {"parser": parser.to_state(), "written": written})
+        game[2] = time.monotonic()
+        game[3] = False
+
+    def retain(self, guids):
+        """
+        Forget the games not in `guids`, e.g. because they were written.
+        """
+        guids = set(guids)
+        for guid in [guid for guid in self.games if guid not in guids]:
+            del self.games[guid]
+
+    def close(self):
+        """
+        Save the ledger copy of every game with rows written since it was last saved.
+        """
+        for guid, game in self.games.items():
+            if game[3]:
+                self._save(guid, game)
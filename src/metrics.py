@@ -0,0 +1,221 @@
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# name -> (type, help) of every metric the ingestion exports
+METRICS = {
+    "vbl_request_seconds": ("histogram", "Latency of VBL web service requests by endpoint"),
+    "vbl_requests_total": ("counter", "VBL web service requests by endpoint and HTTP status or error class"),
+    "vbl_response_bytes_total": ("counter", "Decoded response body bytes downloaded by endpoint"),
+    "parse_seconds": ("histogram", "Time spent in parse_events per game"),
+    "parse_events_total": ("counter", "Raw events parsed"),
+    "db_statement_seconds": ("histogram", "Latency of writer statement groups by writer and group"),
+    "db_rows_total": ("counter", "Rows sent to the database by writer and group"),
+    "db_deadlocks_total": ("counter", "Games the writer retried after losing a deadlock"),
+    "pipeline_queue_depth": ("gauge", "Items waiting in a pipeline queue"),
+    "games_total": ("counter", "Games by outcome (written, failed, dead)"),
+    "ingest_errors_total": ("counter", "Errors by stage and exception class"),
+    "ingest_last_game_timestamp_seconds": ("gauge", "Unix time the last game was committed"),
+    "ingest_last_poll_timestamp_seconds": ("gauge", "Unix time step_two or the daemon last finished a poll"),
+    "query_seconds": ("histogram", "Latency of query service database queries by query"),
+    "query_cache_total": ("counter", "Query service requests by query and cache result (hit, miss)"),
+    "query_cache_invalidations_total": ("counter", "Cached query results dropped after a game was written"),
+}
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Metrics:
+    """
+    Thread-safe counters, gauges and latency histograms of one process.
+
+    They can be rendered in the Prometheus text format, written to a file for the node
+    exporter's textfile collector or served over HTTP. With `log_path` every timing and
+    event is also appended to that file as one JSON object per line.
+    """
+    def __init__(self, log_path=None, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._log = open(log_path, "a", buffering=1) if log_path else None
+        self._log_lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self.values[(name, _label_key(labels))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Observe the duration of the block in the histogram `name`. An exception is passed
+        on; it is counted in ingest_errors_total by whoever handles it, so every failure
+        is counted once.
+        """
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            self.observe(name, seconds, **labels)
+            if self._log is not None:
+                self.log(name, seconds=round(seconds, 6), error=error, **labels)
+
+    def error(self, stage, exception):
+        self.inc("ingest_errors_total", stage=stage, error_class=type(exception).__name__)
+
+    def log(self, event, **fields):
+        """
+        Append one JSON line to the log, if there is one.
+        """
+        if self._log is None:
+            return
+        line = json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, default=str)
+        with self._log_lock:
+            self._log.write(line + "\n")
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            values = dict(self.values)
+            histograms = {key: (list(counts), total, count) for key, (counts, total, count) in self.histograms.items()}
+
+        histogram_names = {name for name, _ in histograms}
+        lines = []
+        for name in sorted({name for name, _ in values} | histogram_names):
+            metric_type, help_text = METRICS.get(name, ("histogram" if name in histogram_names else "untyped", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for (metric, key), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            for (metric, key), (counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', str(bound))])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """
+        Write the metrics to `path` atomically, so a scraper never reads half a file.
+        """
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as file:
+            file.write(self.render())
+        os.replace(temporary, path)
+
+    def serve(self, port, host="0.0.0.0"):
+        """
+        Serve the metrics on http://host:port/metrics from a background thread.
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+    def close(self):
+        if self._log is not None:
+            with self._log_lock:
+                self._log.close()
+                self._log = None
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """
+    Return the process-wide metrics, creating them on first use.
+
+    METRICS_LOG is the JSON-lines log, METRICS_FILE a Prometheus text file rewritten every
+    METRICS_INTERVAL seconds and at exit, and METRICS_PORT serves /metrics over HTTP.
+    """
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics(os.getenv("METRICS_LOG") or None)
+
+            textfile = os.getenv("METRICS_FILE")
+            if textfile:
+                interval = float(os.getenv("METRICS_INTERVAL", "15"))
+                stop = threading.Event()
+
+                def flush():
+                    while not stop.wait(interval):
+                        _metrics.write_textfile(textfile)
+
+                def finish(metrics=_metrics):
+                    stop.set()
+                    metrics.write_textfile(textfile)
+
+                threading.Thread(target=flush, name="metrics-file", daemon=True).start()
+                atexit.register(finish)
+
+            port = os.getenv("METRICS_PORT")
+            if port:
+                _metrics.serve(int(port))
+            atexit.register(_metrics.close)
+        return _metrics
@@ -0,0 +1,574 @@
+import os
+import sys
+
+# Serializes migrations of concurrently starting processes (pg_advisory_xact_lock key)
+MIGRATION_LOCK = 7_262_019
+
+# Tables that can be partitioned by season, in the order write_game first locks them, so
+# creating partitions never holds one parent table while waiting for a writer to free another
+SEASON_PARTITIONED_TABLES = ("Games", "PlayerGames", "Events")
+
+SCHEMA_VERSION_POSTGRES = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT now()
+    );
+"""
+SCHEMA_VERSION_SQLITE = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+
+def partition_by_season():
+    """
+    Whether a new PostgreSQL database gets Games and PlayerGames partitioned by season
+    (DB_PARTITION_BY_SEASON=1). Only read when the tables are created.
+    """
+    return os.getenv("DB_PARTITION_BY_SEASON", "0").lower() in ("1", "true", "yes")
+
+
+# PostgreSQL
+#
+# Every step takes (cursor, partitioned) and must also work on databases created before
+# schema_version existed, which already have some of these tables and columns.
+
+def _postgres_baseline(cursor, partitioned):
+    if partitioned:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS Games (
+                game_guid TEXT NOT NULL,
+                home_team_guid TEXT NOT NULL,
+                home_team_name TEXT NOT NULL,
+                away_team_guid TEXT NOT NULL,
+                away_team_name TEXT NOT NULL,
+                date DATE,
+                poule_guid TEXT NOT NULL,
+                poule_name TEXT NOT NULL,
+                played TEXT NOT NULL,
+                score TEXT NOT NULL,
+                start_time TEXT NOT NULL,
+                season INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (game_guid, season)
+            ) PARTITION BY LIST (season);
+
+            CREATE TABLE IF NOT EXISTS games_default PARTITION OF Games DEFAULT;
+        """)
+    else:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS Games (
+                game_guid TEXT PRIMARY KEY,
+                home_team_guid TEXT NOT NULL,
+                home_team_name TEXT NOT NULL,
+                away_team_guid TEXT NOT NULL,
+                away_team_name TEXT NOT NULL,
+                date DATE,
+                poule_guid TEXT NOT NULL,
+                poule_name TEXT NOT NULL,
+                played TEXT NOT NULL,
+                score TEXT NOT NULL,
+                start_time TEXT NOT NULL
+            );
+        """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Players (
+            player_guid TEXT PRIMARY KEY,
+            name TEXT,
+            birthdate DATE,
+            total_games INTEGER DEFAULT 0,
+            avg_points REAL DEFAULT 0,
+            avg_one_pointers REAL DEFAULT 0,
+            avg_two_pointers REAL DEFAULT 0,
+            avg_three_pointers REAL DEFAULT 0,
+            avg_fouls REAL DEFAULT 0,
+            avg_minutes REAL DEFAULT 0,
+            avg_plus_minus REAL DEFAULT 0
+        );
+    """)
+    if partitioned:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS PlayerGames (
+                player_guid TEXT NOT NULL,
+                game_guid TEXT NOT NULL,
+                team_guid TEXT NOT NULL,
+                total_points INTEGER DEFAULT 0,
+                one_pointers INTEGER DEFAULT 0,
+                two_pointers INTEGER DEFAULT 0,
+                three_pointers INTEGER DEFAULT 0,
+                fouls INTEGER DEFAULT 0,
+                total_minutes INTEGER DEFAULT 0,
+                plus_minus INTEGER DEFAULT 0,
+                season INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (player_guid, game_guid, season),
+                FOREIGN KEY (player_guid) REFERENCES Players(player_guid),
+                FOREIGN KEY (game_guid, season) REFERENCES Games(game_guid, season)
+            ) PARTITION BY LIST (season);
+
+            CREATE TABLE IF NOT EXISTS playergames_default PARTITION OF PlayerGames DEFAULT;
+        """)
+    else:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS PlayerGames (
+                player_guid TEXT NOT NULL,
+                game_guid TEXT NOT NULL,
+                team_guid TEXT NOT NULL,
+                total_points INTEGER DEFAULT 0,
+                one_pointers INTEGER DEFAULT 0,
+                two_pointers INTEGER DEFAULT 0,
+                three_pointers INTEGER DEFAULT 0,
+                fouls INTEGER DEFAULT 0,
+                total_minutes INTEGER DEFAULT 0,
+                plus_minus INTEGER DEFAULT 0,
+                PRIMARY KEY (player_guid, game_guid),
+                FOREIGN KEY (player_guid) REFERENCES Players(player_guid),
+                FOREIGN KEY (game_guid) REFERENCES Games(game_guid)
+            );
+        """)
+    # A partitioned Games has no unique game_guid to reference
+    games_reference = "" if partitioned else ",\n            FOREIGN KEY (game_guid) REFERENCES Games(game_guid)"
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS Quarters (
+            game_guid TEXT NOT NULL,
+            team_guid TEXT NOT NULL,
+            quarter INTEGER NOT NULL,
+            total_points INTEGER DEFAULT 0,
+            one_pointers INTEGER DEFAULT 0,
+            two_pointers INTEGER DEFAULT 0,
+            three_pointers INTEGER DEFAULT 0,
+            fouls INTEGER DEFAULT 0,
+            PRIMARY KEY (game_guid, team_guid, quarter){games_reference}
+        );
+    """)
+    # Databases created from the old schema.sql had a NOT NULL date, but games without a
+    # parseable date are stored with NULL
+    cursor.execute("ALTER TABLE Games ALTER COLUMN date DROP NOT NULL")
+
+
+def _postgres_player_sums(cursor, partitioned):
+    from write_to_postgres import rebuild_player_aggregates
+
+    cursor.execute("""
+        ALTER TABLE Players
+            ADD COLUMN IF NOT EXISTS birthdate DATE,
+            ADD COLUMN IF NOT EXISTS sum_points INTEGER DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS sum_one_pointers INTEGER DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS sum_two_pointers INTEGER DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS sum_three_pointers INTEGER DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS sum_fouls INTEGER DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS sum_minutes INTEGER DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS sum_plus_minus INTEGER DEFAULT 0;
+    """)
+    rebuild_player_aggregates(cursor)
+
+
+def _postgres_standings(cursor, partitioned):
+    from write_to_postgres import rebuild_standings
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Standings (
+            poule_guid TEXT NOT NULL,
+            team_guid TEXT NOT NULL,
+            poule_name TEXT NOT NULL,
+            team_name TEXT NOT NULL,
+            played INTEGER DEFAULT 0,
+            won INTEGER DEFAULT 0,
+            lost INTEGER DEFAULT 0,
+            points_for INTEGER DEFAULT 0,
+            points_against INTEGER DEFAULT 0,
+            differential INTEGER DEFAULT 0,
+            streak INTEGER DEFAULT 0,
+            last_game_date DATE,
+            PRIMARY KEY (poule_guid, team_guid)
+        );
+    """)
+    rebuild_standings(cursor)
+
+
+def _postgres_stints(cursor, partitioned):
+    games_reference = "" if partitioned else ",\n            FOREIGN KEY (game_guid) REFERENCES Games(game_guid)"
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS Stints (
+            game_guid TEXT NOT NULL,
+            team_guid TEXT NOT NULL,
+            stint INTEGER NOT NULL,
+            quarter INTEGER NOT NULL,
+            start_minute INTEGER NOT NULL,
+            end_minute INTEGER NOT NULL,
+            lineup TEXT NOT NULL,
+            player_guids TEXT[] NOT NULL,
+            points_for INTEGER DEFAULT 0,
+            points_against INTEGER DEFAULT 0,
+            PRIMARY KEY (game_guid, team_guid, stint){games_reference}
+        );
+
+        CREATE INDEX IF NOT EXISTS stints_team_lineup ON Stints (team_guid, lineup);
+        CREATE INDEX IF NOT EXISTS stints_player_guids ON Stints USING GIN (player_guids);
+    """)
+
+
+def _postgres_live_player_games(cursor, partitioned):
+    # Provisional PlayerGames rows of games in progress, replaced by PlayerGames once the game is written
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS LivePlayerGames (
+            player_guid TEXT NOT NULL,
+            game_guid TEXT NOT NULL,
+            team_guid TEXT NOT NULL,
+            total_points INTEGER DEFAULT 0,
+            one_pointers INTEGER DEFAULT 0,
+            two_pointers INTEGER DEFAULT 0,
+            three_pointers INTEGER DEFAULT 0,
+            fouls INTEGER DEFAULT 0,
+            total_minutes INTEGER DEFAULT 0,
+            plus_minus INTEGER DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT now(),
+            PRIMARY KEY (player_guid, game_guid)
+        );
+    """)
+
+
+def _postgres_raw_events(cursor, partitioned):
+    # Raw GebNis events, one partition per season (events_<year the season started>)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Events (
+            season INTEGER,
+            game_guid TEXT NOT NULL,
+            sequence INTEGER NOT NULL,
+            period INTEGER,
+            minute INTEGER,
+            event_type INTEGER,
+            status INTEGER,
+            team CHAR(1),
+            shirt TEXT,
+            player_guid TEXT,
+            text TEXT
+        ) PARTITION BY LIST (season);
+
+        CREATE TABLE IF NOT EXISTS events_default PARTITION OF Events DEFAULT;
+        CREATE INDEX IF NOT EXISTS events_game ON Events (game_guid, sequence);
+        CREATE INDEX IF NOT EXISTS events_player ON Events (player_guid);
+    """)
+    # Raw DwfDeelByWedGuid roster entries
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Rosters (
+            game_guid TEXT NOT NULL,
+            team CHAR(1) NOT NULL,
+            player_guid TEXT,
+            data JSONB NOT NULL
+        );
+
+        CREATE INDEX IF NOT EXISTS rosters_game ON Rosters (game_guid);
+    """)
+
+
+def _postgres_seasons_and_indexes(cursor, partitioned):
+    # Year the season started in, 0 when the date is unknown. Partitioned databases have
+    # the columns from the start
+    cursor.execute("""
+        ALTER TABLE Games ADD COLUMN IF NOT EXISTS season INTEGER NOT NULL DEFAULT 0;
+        ALTER TABLE PlayerGames ADD COLUMN IF NOT EXISTS season INTEGER NOT NULL DEFAULT 0;
+
+        UPDATE Games
+        SET season = EXTRACT(YEAR FROM date)::INTEGER - CASE WHEN EXTRACT(MONTH FROM date) >= 7 THEN 0 ELSE 1 END
+        WHERE season = 0 AND date IS NOT NULL;
+
+        UPDATE PlayerGames pg
+        SET season = g.season
+        FROM Games g
+        WHERE pg.game_guid = g.game_guid AND pg.season <> g.season;
+
+        CREATE INDEX IF NOT EXISTS playergames_game ON PlayerGames (game_guid);
+        CREATE INDEX IF NOT EXISTS games_poule_date ON Games (poule_guid, date);
+        CREATE INDEX IF NOT EXISTS games_date ON Games (date);
+        CREATE INDEX IF NOT EXISTS games_season ON Games (season);
+    """)
+
+
+POSTGRES_MIGRATIONS = [
+    (1, "games, players, player games and quarters", _postgres_baseline),
+    (2, "player running sums", _postgres_player_sums),
+    (3, "standings", _postgres_standings),
+    (4, "lineup stints", _postgres_stints),
+    (5, "live player games", _postgres_live_player_games),
+    (6, "raw events and rosters", _postgres_raw_events),
+    (7, "seasons and secondary indexes", _postgres_seasons_and_indexes),
+]
+
+
+def migrate_postgres(conn):
+    """
+    Bring a PostgreSQL database up to the latest version in one transaction and commit.
+    Returns the versions that were applied.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK,))
+        cursor.execute(SCHEMA_VERSION_POSTGRES)
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        current = cursor.fetchone()[0]
+        pending = [migration for migration in POSTGRES_MIGRATIONS if migration[0] > current]
+
+        if pending:
+            # Partitioning is decided when Games is created and can't change afterwards
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('games')")
+            row = cursor.fetchone()
+            partitioned = row[0] == "p" if row else partition_by_season()
+
+            for version, name, step in pending:
+                print(f"Applying schema version {version}: {name}")
+                step(cursor, partitioned)
+                cursor.execute("INSERT INTO schema_version (version, name) VALUES (%s, %s)", (version, name))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return [migration[0] for migration in pending]
+
+
+def create_season_partitions(conn, seasons):
+    """
+    Create the missing partitions of `seasons` of the tables partitioned by season, in a short
+    transaction of their own under the migration lock, and commit. Returns the partitions created.
+
+    Creating a partition locks its parent table exclusively until commit, so this must run on a
+    connection without a transaction that writes games, and it waits for the open transactions
+    of other writers. A season whose rows already sit in a default partition keeps them there.
+    """
+    import psycopg2.errors
+
+    seasons = sorted({int(season) for season in seasons if season})
+    created = []
+    if not seasons:
+        return created
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK,))
+        for table in SEASON_PARTITIONED_TABLES:
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+            row = cursor.fetchone()
+            if row is None or row[0] != "p":
+                continue
+            for season in seasons:
+                partition = f"{table.lower()}_{season}"
+                cursor.execute("SELECT to_regclass(%s)", (partition,))
+                if cursor.fetchone()[0] is not None:
+                    continue
+                cursor.execute("SAVEPOINT partition")
+                try:
+                    cursor.execute(f"CREATE TABLE {partition} PARTITION OF {table} FOR VALUES IN ({season})")
+                except psycopg2.errors.CheckViolation:
+                    cursor.execute("ROLLBACK TO SAVEPOINT partition")
+                    continue
+                cursor.execute("RELEASE SAVEPOINT partition")
+                created.append(partition)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return created
+
+
+# SQLite
+#
+# executescript() would commit the migration transaction, so scripts are run statement by statement
+
+def _sqlite_script(cursor, script):
+    for statement in script.split(";"):
+        if statement.strip():
+            cursor.execute(statement)
+
+
+def _sqlite_baseline(cursor):
+    _sqlite_script(cursor, """
+        CREATE TABLE IF NOT EXISTS Games (
+            game_guid TEXT PRIMARY KEY,
+            home_team_guid TEXT NOT NULL,
+            home_team_name TEXT NOT NULL,
+            away_team_guid TEXT NOT NULL,
+            away_team_name TEXT NOT NULL,
+            date TEXT NOT NULL,
+            poule_guid TEXT NOT NULL,
+            poule_name TEXT NOT NULL,
+            played TEXT NOT NULL,
+            score TEXT NOT NULL,
+            start_time TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS Players (
+            player_guid TEXT PRIMARY KEY,
+            name TEXT,
+            total_games INTEGER DEFAULT 0,
+            avg_points REAL DEFAULT 0,
+            avg_one_pointers REAL DEFAULT 0,
+            avg_two_pointers REAL DEFAULT 0,
+            avg_three_pointers REAL DEFAULT 0,
+            avg_fouls REAL DEFAULT 0,
+            avg_minutes REAL DEFAULT 0,
+            avg_plus_minus REAL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS PlayerGames (
+            player_guid TEXT NOT NULL,
+            game_guid TEXT NOT NULL,
+            team_guid TEXT NOT NULL,
+            total_points INTEGER DEFAULT 0,
+            one_pointers INTEGER DEFAULT 0,
+            two_pointers INTEGER DEFAULT 0,
+            three_pointers INTEGER DEFAULT 0,
+            fouls INTEGER DEFAULT 0,
+            total_minutes INTEGER DEFAULT 0,
+            plus_minus INTEGER DEFAULT 0,
+            PRIMARY KEY (player_guid, game_guid),
+            FOREIGN KEY (player_guid) REFERENCES Players(player_guid),
+            FOREIGN KEY (game_guid) REFERENCES Games(game_guid)
+        );
+        CREATE TABLE IF NOT EXISTS Quarters (
+            game_guid TEXT NOT NULL,
+            team_guid TEXT NOT NULL,
+            quarter INTEGER NOT NULL,
+            total_points INTEGER DEFAULT 0,
+            one_pointers INTEGER DEFAULT 0,
+            two_pointers INTEGER DEFAULT 0,
+            three_pointers INTEGER DEFAULT 0,
+            fouls INTEGER DEFAULT 0,
+            PRIMARY KEY (game_guid, team_guid, quarter),
+            FOREIGN KEY (game_guid) REFERENCES Games(game_guid)
+        );
+    """)
+
+
+def _sqlite_add_columns(cursor, table, columns):
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    for column, column_type in columns:
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+
+def _sqlite_player_sums(cursor):
+    from write_to_sqlite import PLAYER_SUM_COLUMNS, rebuild_player_aggregates
+
+    _sqlite_add_columns(cursor, "Players", [(column, "INTEGER DEFAULT 0") for column in PLAYER_SUM_COLUMNS])
+    rebuild_player_aggregates(cursor)
+
+
+def _sqlite_stints(cursor):
+    _sqlite_script(cursor, """
+        CREATE TABLE IF NOT EXISTS Stints (
+            game_guid TEXT NOT NULL,
+            team_guid TEXT NOT NULL,
+            stint INTEGER NOT NULL,
+            quarter INTEGER NOT NULL,
+            start_minute INTEGER NOT NULL,
+            end_minute INTEGER NOT NULL,
+            lineup TEXT NOT NULL,
+            points_for INTEGER DEFAULT 0,
+            points_against INTEGER DEFAULT 0,
+            PRIMARY KEY (game_guid, team_guid, stint),
+            FOREIGN KEY (game_guid) REFERENCES Games(game_guid)
+        );
+        CREATE INDEX IF NOT EXISTS stints_team_lineup ON Stints (team_guid, lineup);
+    """)
+
+
+def _sqlite_birthdate_and_indexes(cursor):
+    _sqlite_add_columns(cursor, "Players", [("birthdate", "TEXT")])
+    _sqlite_script(cursor, """
+        CREATE INDEX IF NOT EXISTS playergames_game ON PlayerGames (game_guid);
+        CREATE INDEX IF NOT EXISTS games_poule_date ON Games (poule_guid, date);
+        CREATE INDEX IF NOT EXISTS games_date ON Games (date);
+    """)
+
+
+def _sqlite_iso_game_dates(cursor):
+    # Dates were stored as the API's dd-mm-yyyy, which doesn't sort, so the date indexes
+    # couldn't serve a range. Store yyyy-mm-dd and, like PostgreSQL, NULL when the date is
+    # unknown. SQLite can't drop a NOT NULL, so Games is rebuilt.
+    _sqlite_script(cursor, """
+        CREATE TABLE Games_new (
+            game_guid TEXT PRIMARY KEY,
+            home_team_guid TEXT NOT NULL,
+            home_team_name TEXT NOT NULL,
+            away_team_guid TEXT NOT NULL,
+            away_team_name TEXT NOT NULL,
+            date TEXT,
+            poule_guid TEXT NOT NULL,
+            poule_name TEXT NOT NULL,
+            played TEXT NOT NULL,
+            score TEXT NOT NULL,
+            start_time TEXT NOT NULL
+        );
+        INSERT INTO Games_new
+        SELECT game_guid, home_team_guid, home_team_name, away_team_guid, away_team_name,
+               CASE
+                   WHEN date GLOB '[0-9][0-9]-[0-9][0-9]-[0-9][0-9][0-9][0-9]'
+                       THEN substr(date, 7, 4) || '-' || substr(date, 4, 2) || '-' || substr(date, 1, 2)
+                   WHEN date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]' THEN date
+               END,
+               poule_guid, poule_name, played, score, start_time
+        FROM Games;
+        DROP TABLE Games;
+        ALTER TABLE Games_new RENAME TO Games;
+        CREATE INDEX games_poule_date ON Games (poule_guid, date);
+        CREATE INDEX games_date ON Games (date);
+    """)
+
+
+SQLITE_MIGRATIONS = [
+    (1, "games, players, player games and quarters", _sqlite_baseline),
+    (2, "player running sums", _sqlite_player_sums),
+    (3, "lineup stints", _sqlite_stints),
+    (4, "player birthdates and secondary indexes", _sqlite_birthdate_and_indexes),
+    (5, "ISO game dates", _sqlite_iso_game_dates),
+]
+
+
+def migrate_sqlite(conn):
+    """
+    Bring a SQLite database up to the latest version and commit. Returns the versions that were applied.
+    """
+    cursor = conn.cursor()
+    cursor.executescript(SCHEMA_VERSION_SQLITE)
+    # Take the write lock before reading the version so two processes don't both migrate
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        current = cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+        pending = [migration for migration in SQLITE_MIGRATIONS if migration[0] > current]
+        for version, name, step in pending:
+            print(f"Applying schema version {version}: {name}")
+            step(cursor)
+            cursor.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (version, name))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return [migration[0] for migration in pending]
+
+
+if __name__ == "__main__":
+    # python3 src/migrations.py [SQLITE_PATH]: migrate the PostgreSQL database from .env, or a SQLite file
+    import psycopg2
+    import sqlite3
+    from dotenv import load_dotenv
+
+    if len(sys.argv) > 1:
+        conn = sqlite3.connect(sys.argv[1])
+        applied = migrate_sqlite(conn)
+    else:
+        load_dotenv()
+        conn = psycopg2.connect(
+            dbname=os.getenv("DB_NAME"),
+            user=os.getenv("DB_USER"),
+            password=os.getenv("DB_PASSWORD"),
+            host=os.getenv("DB_HOST"),
+            port=os.getenv("DB_PORT"),
+        )
+        applied = migrate_postgres(conn)
+    conn.close()
+    print(f"Applied {len(applied)} migrations" if applied else "Schema is up to date")
@@ -1,10 +1,87 @@
-from typing import Dict, Optional, Set, List, Union
+from typing import Dict, Optional, List, Union
 import re
 
+# Text of a scoring event, e.g. "2 (45-40)"
+POINTS_PATTERN = re.compile(r"^(\d+) \(\d+-\d+\)$")
+
+SCORE = 10
+FOUL = 30
+SUBSTITUTION = 50
+CONFIRMED = 10
+
+# parse_events closes the minutes of players still on court as if every period lasts 10 minutes
+PERIOD_MINUTES = 10
+
+# Stints end at the real end of their period: four quarters of 10 minutes, then overtimes of 5
+REGULAR_PERIODS = 4
+OVERTIME_MINUTES = 5
+
+LINEUP_SIZE = 5
+
+# Points of every scoring text seen so far, or -1 when it doesn't match POINTS_PATTERN. Most
+# scores of a season repeat across games, so the pattern runs once per distinct text.
+_points_by_text = {}
+POINTS_CACHE_SIZE = 65536
+
+
+def period_minutes(quarter):
+    return PERIOD_MINUTES if quarter <= REGULAR_PERIODS else OVERTIME_MINUTES
+
+
+class PlayerQuarterStats:
+    __slots__ = ("totalPoints", "onePointers", "twoPointers", "threePointers", "fouls",
+                 "minutesPlayed", "inTime", "plusMinus")
+
+    def __init__(self):
+        self.totalPoints = 0
+        self.onePointers = 0
+        self.twoPointers = 0
+        self.threePointers = 0
+        self.fouls = 0
+        self.minutesPlayed = 0
+        self.inTime = None
+        self.plusMinus = 0
+
+    def to_dict(self):
+        return {
+            "totalPoints": self.totalPoints,
+            "onePointers": self.onePointers,
+            "twoPointers": self.twoPointers,
+            "threePointers": self.threePointers,
+            "fouls": self.fouls,
+            "minutesPlayed": self.minutesPlayed,
+            "inTime": self.inTime,
+            "plusMinus": self.plusMinus,
+        }
+
+
+class TeamQuarterStats:
+    __slots__ = ("totalPoints", "onePointers", "twoPointers", "threePointers", "fouls")
+
+    def __init__(self):
+        self.totalPoints = 0
+        self.onePointers = 0
+        self.twoPointers = 0
+        self.threePointers = 0
+        self.fouls = 0
+
+    def to_dict(self):
+        return {
+            "totalPoints": self.totalPoints,
+            "onePointers": self.onePointers,
+            "twoPointers": self.twoPointers,
+            "threePointers": self.threePointers,
+            "fouls": self.fouls,
+        }
+
+
 class PlayerStats:
+    __slots__ = ("totalPoints", "quarters", "onePointers", "twoPointers", "threePointers", "fouls",
+                 "totalMinutesPlayed", "RelGUID", "plusMinus")
+
     def __init__(self):
         self.totalPoints = 0
-        self.quarters = {}
+        self.quarters: Dict[int, PlayerQuarterStats] = {}
         self.onePointers = 0
         self.twoPointers = 0
         self.threePointers = 0
@@ -16,7 +93,7 @@ class PlayerStats:
     def to_dict(self):
         return {
             "totalPoints": self.totalPoints,
-            "quarters": self.quarters,
+            "quarters": {quarter: stats.to_dict() for quarter, stats in self.quarters.items()},
             "onePointers": self.onePointers,
             "twoPointers": self.twoPointers,
             "threePointers": self.threePointers,
@@ -28,14 +105,47 @@ class PlayerStats:
 
 
 class TeamStats:
+    __slots__ = ("players", "totalPoints", "quarters")
+
     def __init__(self):
         self.players: Dict[str, PlayerStats] = {}
         self.totalPoints = 0
+        # Team totals per period; regulation quarters always exist, overtime periods are added when played
+        self.quarters: Dict[int, TeamQuarterStats] = {quarter: TeamQuarterStats() for quarter in range(1, 5)}
 
     def to_dict(self):
         return {
             "players": {player_id: player.to_dict() for player_id, player in self.players.items()},
             "totalPoints": self.totalPoints,
+            "quarters": {quarter: stats.to_dict() for quarter, stats in self.quarters.items()},
+        }
+
+
+class Stint:
+    """
+    A stretch of a period in which a team's lineup didn't change. `players` are the shirt
+    numbers on court, in the order they came on.
+    """
+    __slots__ = ("side", "quarter", "startMinute", "endMinute", "players", "pointsFor", "pointsAgainst")
+
+    def __init__(self, side, quarter, start_minute, end_minute, players, points_for, points_against):
+        self.side = side
+        self.quarter = quarter
+        self.startMinute = start_minute
+        self.endMinute = end_minute
+        self.players = players
+        self.pointsFor = points_for
+        self.pointsAgainst = points_against
+
+    def to_dict(self):
+        return {
+            "team": "homeTeam" if self.side == 0 else "awayTeam",
+            "quarter": self.quarter,
+            "startMinute": self.startMinute,
+            "endMinute": self.endMinute,
+            "players": list(self.players),
+            "pointsFor": self.pointsFor,
+            "pointsAgainst": self.pointsAgainst,
         }
 
 
@@ -43,6 +153,9 @@ class GameStats:
     def __init__(self):
         self.homeTeam = TeamStats()
         self.awayTeam = TeamStats()
+        # Five-player lineups in the format of build_stints; the stints are built on first use
+        self.lineups = []
+        self._stints: Optional[List[Stint]] = None
         self.teamThuisGUID = ""
         self.teamThuisNaam = ""
         self.teamUitGUID = ""
@@ -70,133 +183,525 @@ class GameStats:
             "uitslag": self.uitslag,
             "beginTijd": self.beginTijd,
             "guid": self.guid,
+            "stints": [stint.to_dict() for stint in self.stints],
         }
 
-def parse_events(events: List[Dict[str, Union[str, int]]]) -> GameStats:
-    game_stats = GameStats()
-
-    # Original logic for parsing events
-    players_on_court = {"homeTeam": set(), "awayTeam": set()}
-
-    for event in events:
-        quarter = event["Periode"]
-        team = "homeTeam" if event["TofU"] == "T" else "awayTeam"
-        opponent_team = "awayTeam" if team == "homeTeam" else "homeTeam"
-        player = event["RugNr"]
-
-        if player not in game_stats.__getattribute__(team).players:
-            game_stats.__getattribute__(team).players[player] = PlayerStats()
-
-        player_stats = game_stats.__getattribute__(team).players[player]
-        if quarter not in player_stats.quarters:
-            player_stats.quarters[quarter] = {
-                "totalPoints": 0,
-                "onePointers": 0,
-                "twoPointers": 0,
-                "threePointers": 0,
-                "fouls": 0,
-                "minutesPlayed": 0,
-                "inTime": None,
-                "plusMinus": 0,
-            }
+    @property
+    def stints(self) -> List[Stint]:
+        if self._stints is None:
+            self._stints = build_stints(self.lineups, self.period_scores())
+        return self._stints
 
-        # Initialize quarter stats if not already present
-        player_stats = game_stats.__getattribute__(team).players[player]
-        if quarter not in player_stats.quarters:
-            player_stats.quarters[quarter] = {
-                "totalPoints": 0,
-                "onePointers": 0,
-                "twoPointers": 0,
-                "threePointers": 0,
-                "fouls": 0,
-                "minutesPlayed": 0,
-                "inTime": None,
-                "plusMinus": 0
-            }
+    def period_scores(self):
+        """
+        (quarter, home points, away points) at the start of every period played, in order, and
+        then the final score as (None, home points, away points).
+        """
+        home_quarters, away_quarters = self.homeTeam.quarters, self.awayTeam.quarters
+        periods = []
+        home = away = 0
+        for quarter in sorted(home_quarters.keys() | away_quarters.keys()):
+            periods.append((quarter, home, away))
+            if quarter in home_quarters:
+                home += home_quarters[quarter].totalPoints
+            if quarter in away_quarters:
+                away += away_quarters[quarter].totalPoints
+        periods.append((None, home, away))
+        return periods
+
+    def quarter_rows(self):
+        """
+        (team_guid, quarter, total_points, one_pointers, two_pointers, three_pointers, fouls) rows for the Quarters table.
+        """
+        rows = []
+        for team_guid, team_stats in ((self.teamThuisGUID, self.homeTeam), (self.teamUitGUID, self.awayTeam)):
+            for quarter in sorted(team_stats.quarters):
+                stats = team_stats.quarters[quarter]
+                rows.append((
+                    team_guid,
+                    quarter,
+                    stats.totalPoints,
+                    stats.onePointers,
+                    stats.twoPointers,
+                    stats.threePointers,
+                    stats.fouls,
+                ))
+        return rows
+
+    def stint_rows(self):
+        """
+        (team_guid, stint, quarter, start_minute, end_minute, lineup, player_guids, points_for, points_against)
+        rows for the Stints table. `lineup` is the sorted player GUIDs joined by commas.
+        """
+        rows = []
+        sequence = [0, 0]
+        teams = ((self.teamThuisGUID, self.homeTeam), (self.teamUitGUID, self.awayTeam))
+        for stint in self.stints:
+            team_guid, team_stats = teams[stint.side]
+            player_guids = sorted(team_stats.players[player].RelGUID for player in stint.players)
+            sequence[stint.side] += 1
+            rows.append((
+                team_guid,
+                sequence[stint.side],
+                stint.quarter,
+                stint.startMinute,
+                stint.endMinute,
+                ",".join(player_guids),
+                player_guids,
+                stint.pointsFor,
+                stint.pointsAgainst,
+            ))
+        return rows
+
+
+def build_stints(lineups, periods) -> List[Stint]:
+    """
+    Turn the five-player lineups recorded by GameParser into stints. A lineup is
+    (side, start, end quarter, end minute, end home points, end away points, players), where
+    start is (quarter, minute, home points, away points) and an end quarter of None is the end
+    of the game. `periods` is GameStats.period_scores.
 
-        # Handle scoring events
-        if event["GebType"] == 10 and event["GebStatus"] == 10:
-            points_match = re.match(r"^(\d+) \(\d+-\d+\)$", event["Text"])
-            if points_match:
-                points = int(points_match.group(1))
-
-                # Update team score
-                game_stats.__getattribute__(team).totalPoints += points
-
-                # Update plus-minus for players currently on the floor
-                for on_court_player in players_on_court[team]:
-                    game_stats.__getattribute__(team).players[on_court_player].plusMinus += points
-                    game_stats.__getattribute__(team).players[on_court_player].quarters[quarter]["plusMinus"] += points
-
-                for on_court_player in players_on_court[opponent_team]:
-                    game_stats.__getattribute__(opponent_team).players[on_court_player].plusMinus -= points
-                    game_stats.__getattribute__(opponent_team).players[on_court_player].quarters[quarter]["plusMinus"] -= points
-
-                # Update individual player scoring stats
-                player_stats.totalPoints += points
-                player_stats.quarters[quarter]["totalPoints"] += points
-
-                # Update point type
-                if points == 1:
-                    player_stats.onePointers += 1
-                    player_stats.quarters[quarter]["onePointers"] += 1
-                elif points == 2:
-                    player_stats.twoPointers += 1
-                    player_stats.quarters[quarter]["twoPointers"] += 1
-                elif points == 3:
-                    player_stats.threePointers += 1
-                    player_stats.quarters[quarter]["threePointers"] += 1
-
-        # Handle foul events
-        elif event["GebType"] == 30 and event["GebStatus"] == 10:
-            player_stats.fouls += 1
-            player_stats.quarters[quarter]["fouls"] += 1
-
-        # Handle substitution events
-        elif event["GebType"] == 50 and event["GebStatus"] == 10:
-            if event["Text"] == "in":
-                player_stats.quarters[quarter]["inTime"] = event["Minuut"]
-                players_on_court[team].add(player)
-            elif event["Text"] == "uit":
-                in_time = player_stats.quarters[quarter]["inTime"]
-                if in_time is not None:
-                    out_time = event["Minuut"]
-                    minutes_played = out_time - in_time
-
-                    player_stats.quarters[quarter]["minutesPlayed"] += minutes_played
-                    player_stats.totalMinutesPlayed += minutes_played
-                    player_stats.quarters[quarter]["inTime"] = None
-                    players_on_court[team].discard(player)
-
-        # Set RelGUID for the player
-        player_stats.RelGUID = event["RelGUID"]
-
-    # Handle end-of-quarter for players still on court
-    for team_name in ["homeTeam", "awayTeam"]:
-        for player in game_stats.__getattribute__(team_name).players.values():
-            for quarter, stats in player.quarters.items():
-                in_time = stats["inTime"]
-                if in_time is not None:
-                    minutes_played = 10 - in_time
-                    stats["minutesPlayed"] += minutes_played
-                    player.totalMinutesPlayed += minutes_played
-                    stats["inTime"] = None
-
-    # Normalize minutes played across quarters
-    for team_name in ["homeTeam", "awayTeam"]:
-        for quarter in range(1, 5):
-            total_minutes_for_quarter = sum(
-                player.quarters.get(quarter, {}).get("minutesPlayed", 0)
-                for player in game_stats.__getattribute__(team_name).players.values()
-            )
-
-            if total_minutes_for_quarter != 50:
-                normalization_factor = 50 / total_minutes_for_quarter if total_minutes_for_quarter > 0 else 1
-                for player in game_stats.__getattribute__(team_name).players.values():
-                    if quarter in player.quarters:
-                        original_minutes = player.quarters[quarter]["minutesPlayed"]
+    A lineup that stayed on court over the end of a period is split into one stint per
+    period. Stints without playing time or points are dropped.
+    """
+    stints = []
+    append = stints.append
+    index_of = {period[0]: index for index, period in enumerate(periods)}
+    last_quarter = periods[-2][0]
+
+    for side, (quarter, minute, home, away), end_quarter, end_minute, end_home, end_away, players in lineups:
+        if end_quarter is None:
+            end_quarter = last_quarter
+            end_minute = period_minutes(last_quarter)
+        while True:
+            if quarter == end_quarter:
+                stop_minute, stop_home, stop_away = end_minute, end_home, end_away
+            else:
+                # The lineup stayed on court over the end of the period
+                index = index_of[quarter] + 1
+                if index > index_of[end_quarter]:
+                    break
+                stop_minute = period_minutes(quarter)
+                _, stop_home, stop_away = periods[index]
+
+            home_scored = stop_home - home
+            away_scored = stop_away - away
+            if minute is not None and stop_minute is not None and (
+                    stop_minute > minute or home_scored or away_scored):
+                if side == 0:
+                    append(Stint(0, quarter, minute, stop_minute, players, home_scored, away_scored))
+                else:
+                    append(Stint(1, quarter, minute, stop_minute, players, away_scored, home_scored))
+
+            if quarter == end_quarter:
+                break
+            quarter, home, away = periods[index]
+            minute = 0
+
+    return stints
+
+
+class GameParser:
+    """
+    Resumable state of parse_events. `apply` folds the next slice of a game's events into the
+    running counters, on-court sets and minutes, so a live game costs work proportional to its
+    new events; `snapshot` returns the statistics the events so far would give of the players
+    those new events may have changed. The state can be saved with `to_state` and restored with
+    `from_state`, e.g. after a restart.
+
+    When `apply` raises, the parser is left half-way through an event and must be discarded.
+    """
+    __slots__ = ("game_stats", "players_on_court", "plus_minus_quarter",
+                 "missing_quarter_stats", "lineups", "lineup_starts", "events_applied", "last_event",
+                 "touched_events", "normalized_quarters")
+
+    def __init__(self):
+        self.game_stats = GameStats()
+        # Plus-minus is settled lazily: instead of crediting every on-court player on every basket,
+        # we remember the score differential (home points minus away points) when a player came on
+        # and settle the difference when they go off or the scoring moves to another quarter.
+        self.players_on_court = ({}, {})  # player -> differential when they came on court
+        self.plus_minus_quarter = None  # quarter the unsettled plus-minus belongs to
+        self.missing_quarter_stats = 0  # on-court players without stats for plus_minus_quarter
+        # Every five-player lineup that left the court as (side, start, end quarter, end minute,
+        # end home points, end away points, players), where start is (quarter, minute, home points,
+        # away points); GameStats.stints builds the stints from them. A lineup of any other size
+        # means the scorer missed a substitution.
+        self.lineups = []
+        self.lineup_starts = [None, None]  # start of the five players on court now, per side
+        self.events_applied = 0
+        self.last_event = None
+        # The event lists applied since the last snapshot, or None when every player counts as touched
+        self.touched_events = []
+        self.normalized_quarters = (set(), set())  # quarters per side the last snapshot normalized
+
+    def new_events(self, events):
+        """
+        The events of a full event list that haven't been applied yet, or None when the
+        list no longer starts with the applied events (e.g. a corrected event) and the
+        game has to be parsed from scratch.
+        """
+        applied = self.events_applied
+        if applied > len(events) or (applied and events[applied - 1] != self.last_event):
+            return None
+        return events[applied:]
+
+    def apply(self, events: List[Dict[str, Union[str, int]]]):
+        game_stats = self.game_stats
+        # Index 0 is the home team ("T"), index 1 the away team ("U")
+        teams = (game_stats.homeTeam, game_stats.awayTeam)
+        match_points = POINTS_PATTERN.match
+        points_by_text = _points_by_text
+
+        players_on_court = self.players_on_court
+        plus_minus_quarter = self.plus_minus_quarter
+        missing_quarter_stats = self.missing_quarter_stats
+        home_stats, away_stats = teams
+        home_points = home_stats.totalPoints
+        away_points = away_stats.totalPoints
+        lineup_starts = self.lineup_starts
+        record_lineup = self.lineups.append
+
+        for event in events:
+            quarter = event["Periode"]
+            side = 0 if event["TofU"] == "T" else 1
+            team_stats = teams[side]
+            player = event["RugNr"]
+
+            player_stats = team_stats.players.get(player)
+            if player_stats is None:
+                player_stats = team_stats.players[player] = PlayerStats()
+
+            player_quarter = player_stats.quarters.get(quarter)
+            if player_quarter is None:
+                player_quarter = player_stats.quarters[quarter] = PlayerQuarterStats()
+                if quarter == plus_minus_quarter and player in players_on_court[side]:
+                    missing_quarter_stats -= 1
+
+            if event["GebStatus"] == CONFIRMED:
+                event_type = event["GebType"]
+
+                # Handle substitution events
+                if event_type == SUBSTITUTION:
+                    text = event["Text"]
+                    if text == "in":
+                        minute = event["Minuut"]
+                        player_quarter.inTime = minute
+                        on_court = players_on_court[side]
+                        if player not in on_court:
+                            size = len(on_court)
+                            if size == LINEUP_SIZE:
+                                record_lineup((side, lineup_starts[side], quarter, minute, home_points, away_points,
+                                               tuple(on_court)))
+                            on_court[player] = home_points - away_points
+                            if size == LINEUP_SIZE - 1:
+                                lineup_starts[side] = (quarter, minute, home_points, away_points)
+                            if plus_minus_quarter is not None and plus_minus_quarter not in player_stats.quarters:
+                                missing_quarter_stats += 1
+                    elif text == "uit":
+                        in_time = player_quarter.inTime
+                        if in_time is not None:
+                            minute = event["Minuut"]
+                            minutes_played = minute - in_time
+
+                            player_quarter.minutesPlayed += minutes_played
+                            player_stats.totalMinutesPlayed += minutes_played
+                            player_quarter.inTime = None
+
+                            on_court = players_on_court[side]
+                            if player in on_court:
+                                size = len(on_court)
+                                if size == LINEUP_SIZE:
+                                    record_lineup((side, lineup_starts[side], quarter, minute, home_points, away_points,
+                                                   tuple(on_court)))
+                                mark = on_court.pop(player)
+                                if size == LINEUP_SIZE + 1:
+                                    lineup_starts[side] = (quarter, minute, home_points, away_points)
+                                differential = home_points - away_points
+                                change = differential - mark if side == 0 else mark - differential
+                                if change:
+                                    player_stats.plusMinus += change
+                                    player_stats.quarters[plus_minus_quarter].plusMinus += change
+                                if plus_minus_quarter not in player_stats.quarters:
+                                    missing_quarter_stats -= 1
+
+                # Handle scoring events
+                elif event_type == SCORE:
+                    text = event["Text"]
+                    points = points_by_text.get(text)
+                    if points is None:
+                        points_match = match_points(text)
+                        points = int(points_match.group(1)) if points_match else -1
+                        if len(points_by_text) >= POINTS_CACHE_SIZE:
+                            points_by_text.clear()
+                        points_by_text[text] = points
+                    if points >= 0:
+                        # Update plus-minus for players currently on the floor
+                        if quarter != plus_minus_quarter:
+                            differential = home_points - away_points
+                            for on_court_side in (0, 1):
+                                on_court = players_on_court[on_court_side]
+                                for on_court_player, mark in on_court.items():
+                                    _settle(teams, on_court_side, on_court_player, mark, differential, plus_minus_quarter)
+                                    on_court[on_court_player] = differential
+                            plus_minus_quarter = quarter
+                            missing_quarter_stats = sum(
+                                quarter not in teams[on_court_side].players[on_court_player].quarters
+                                for on_court_side in (0, 1)
+                                for on_court_player in players_on_court[on_court_side]
+                            )
+                        if missing_quarter_stats:
+                            # Every on-court player needs stats for the quarter the points are scored in
+                            raise KeyError(quarter)
+
+                        # Update team score
+                        if side == 0:
+                            home_points += points
+                        else:
+                            away_points += points
+
+                        team_quarter = team_stats.quarters.get(quarter)
+                        if team_quarter is None:
+                            team_quarter = team_stats.quarters[quarter] = TeamQuarterStats()
+
+                        # Update individual player scoring stats
+                        player_stats.totalPoints += points
+                        player_quarter.totalPoints += points
+                        team_quarter.totalPoints += points
+
+                        # Update point type
+                        if points == 2:
+                            player_stats.twoPointers += 1
+                            player_quarter.twoPointers += 1
+                            team_quarter.twoPointers += 1
+                        elif points == 1:
+                            player_stats.onePointers += 1
+                            player_quarter.onePointers += 1
+                            team_quarter.onePointers += 1
+                        elif points == 3:
+                            player_stats.threePointers += 1
+                            player_quarter.threePointers += 1
+                            team_quarter.threePointers += 1
+
+                # Handle foul events
+                elif event_type == FOUL:
+                    team_quarter = team_stats.quarters.get(quarter)
+                    if team_quarter is None:
+                        team_quarter = team_stats.quarters[quarter] = TeamQuarterStats()
+
+                    player_stats.fouls += 1
+                    player_quarter.fouls += 1
+                    team_quarter.fouls += 1
+
+            # Set RelGUID for the player
+            player_stats.RelGUID = event["RelGUID"]
+
+        home_stats.totalPoints = home_points
+        away_stats.totalPoints = away_points
+        self.plus_minus_quarter = plus_minus_quarter
+        self.missing_quarter_stats = missing_quarter_stats
+        if events:
+            self.events_applied += len(events)
+            self.last_event = events[-1]
+            if self.touched_events is not None:
+                self.touched_events.append(events)
+        return self
+
+    def _finish(self) -> GameStats:
+        """
+        Settle plus-minus, close the minutes and lineups of players still on court and
+        normalize minutes. This consumes the parser's state.
+        """
+        game_stats = self.game_stats
+        teams = (game_stats.homeTeam, game_stats.awayTeam)
+        differential = teams[0].totalPoints - teams[1].totalPoints
+        plus_minus_quarter = self.plus_minus_quarter
+        players_on_court = self.players_on_court
+
+        for side, on_court in enumerate(players_on_court):
+            for on_court_player, mark in on_court.items():
+                _settle(teams, side, on_court_player, mark, differential, plus_minus_quarter)
+
+        for team_stats in teams:
+            team_quarters = team_stats.quarters
+            players = team_stats.players.values()
+            regular_minutes = {quarter: 0 for quarter in range(1, 5)}
+
+            # Handle end-of-quarter for players still on court
+            for player in players:
+                for quarter, stats in player.quarters.items():
+                    # Every period the team appeared in gets a row, even without points or fouls
+                    if quarter not in team_quarters:
+                        team_quarters[quarter] = TeamQuarterStats()
+
+                    in_time = stats.inTime
+                    if in_time is not None:
+                        minutes_played = PERIOD_MINUTES - in_time
+                        stats.minutesPlayed += minutes_played
+                        player.totalMinutesPlayed += minutes_played
+                        stats.inTime = None
+
+                    if quarter in regular_minutes:
+                        regular_minutes[quarter] += stats.minutesPlayed
+
+            # Normalize minutes played across quarters
+            for quarter, total_minutes_for_quarter in regular_minutes.items():
+                if total_minutes_for_quarter != 50:
+                    normalization_factor = 50 / total_minutes_for_quarter if total_minutes_for_quarter > 0 else 1
+                    for player in players:
+                        stats = player.quarters.get(quarter)
+                        if stats is None:
+                            continue
+                        original_minutes = stats.minutesPlayed
                         adjusted_minutes = round(original_minutes * normalization_factor)
                         player.totalMinutesPlayed += adjusted_minutes - original_minutes
-                        player.quarters[quarter]["minutesPlayed"] = adjusted_minutes
+                        stats.minutesPlayed = adjusted_minutes
+
+        # Close the lineups still on court at the final score; GameStats.stints builds the stints
+        lineups = game_stats.lineups = self.lineups
+        home, away = teams[0].totalPoints, teams[1].totalPoints
+        for side, on_court in enumerate(players_on_court):
+            if len(on_court) == LINEUP_SIZE:
+                lineups.append((side, self.lineup_starts[side], None, None, home, away, tuple(on_court)))
+
+        return game_stats
+
+    def snapshot(self) -> GameStats:
+        """
+        GameStats of the events applied so far with only the players whose totals, minutes or
+        plus-minus may have changed since the previous snapshot: those with events since then,
+        those on court and those of a quarter whose minutes get normalized now or did at the
+        previous snapshot. Their minutes and plus-minus are settled as `_finish` would on copies
+        without quarters, so the parser can go on; team quarters and stints are left out.
+        """
+        game_stats = self.game_stats
+        teams = (game_stats.homeTeam, game_stats.awayTeam)
+        differential = teams[0].totalPoints - teams[1].totalPoints
+
+        touched = None
+        if self.touched_events is not None:
+            touched = (set(), set())
+            for events in self.touched_events:
+                for event in events:
+                    touched[0 if event["TofU"] == "T" else 1].add(event["RugNr"])
+        self.touched_events = []
+
+        snapshot = GameStats()
+        for side, (team_stats, snapshot_team) in enumerate(zip(teams, (snapshot.homeTeam, snapshot.awayTeam))):
+            snapshot_team.totalPoints = team_stats.totalPoints
+            on_court = self.players_on_court[side]
+
+            # The minutes of every regular quarter as _finish closes them, to find the normalized ones
+            regular_minutes = {quarter: 0 for quarter in range(1, 5)}
+            for player_stats in team_stats.players.values():
+                for quarter, stats in player_stats.quarters.items():
+                    if quarter in regular_minutes:
+                        regular_minutes[quarter] += _closed_minutes(stats)
+            normalized = {quarter: 50 / minutes if minutes > 0 else 1
+                          for quarter, minutes in regular_minutes.items() if minutes != 50}
+            changed_quarters = self.normalized_quarters[side] | normalized.keys()
+            self.normalized_quarters[side].clear()
+            self.normalized_quarters[side].update(normalized)
+
+            for player, player_stats in team_stats.players.items():
+                quarters = player_stats.quarters
+                if touched is not None and player not in touched[side] and player not in on_court and \
+                        not any(quarter in quarters for quarter in changed_quarters):
+                    continue
+
+                copied = snapshot_team.players[player] = PlayerStats()
+                for name in PlayerStats.__slots__:
+                    if name != "quarters":
+                        setattr(copied, name, getattr(player_stats, name))
+
+                for quarter, stats in quarters.items():
+                    minutes = _closed_minutes(stats)
+                    if quarter in normalized:
+                        minutes = round(minutes * normalized[quarter])
+                    copied.totalMinutesPlayed += minutes - stats.minutesPlayed
+
+                if player in on_court:
+                    mark = on_court[player]
+                    copied.plusMinus += differential - mark if side == 0 else mark - differential
+
+        return snapshot
+
+    def to_state(self):
+        """
+        JSON-serializable state of the parser.
+        """
+        def team_state(team):
+            return {
+                "players": [
+                    [player, _slots_state(stats, exclude="quarters"),
+                     [[quarter, _slots_state(quarter_stats)] for quarter, quarter_stats in stats.quarters.items()]]
+                    for player, stats in team.players.items()
+                ],
+                "totalPoints": team.totalPoints,
+                "quarters": [[quarter, _slots_state(stats)] for quarter, stats in team.quarters.items()],
+            }
 
-    return game_stats
+        return {
+            "homeTeam": team_state(self.game_stats.homeTeam),
+            "awayTeam": team_state(self.game_stats.awayTeam),
+            "playersOnCourt": [list(map(list, on_court.items())) for on_court in self.players_on_court],
+            "plusMinusQuarter": self.plus_minus_quarter,
+            "missingQuarterStats": self.missing_quarter_stats,
+            "lineups": [[*lineup[:-1], list(lineup[-1])] for lineup in self.lineups],
+            "lineupStarts": [start and list(start) for start in self.lineup_starts],
+            "eventsApplied": self.events_applied,
+            "lastEvent": self.last_event,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        parser = cls()
+        for team, team_state in ((parser.game_stats.homeTeam, state["homeTeam"]),
+                                 (parser.game_stats.awayTeam, state["awayTeam"])):
+            for player, player_state, quarter_states in team_state["players"]:
+                stats = team.players[player] = _from_slots_state(PlayerStats, player_state)
+                for quarter, quarter_state in quarter_states:
+                    stats.quarters[quarter] = _from_slots_state(PlayerQuarterStats, quarter_state)
+            team.totalPoints = team_state["totalPoints"]
+            for quarter, quarter_state in team_state["quarters"]:
+                team.quarters[quarter] = _from_slots_state(TeamQuarterStats, quarter_state)
+
+        parser.players_on_court = tuple(dict(map(tuple, on_court)) for on_court in state["playersOnCourt"])
+        parser.plus_minus_quarter = state["plusMinusQuarter"]
+        parser.missing_quarter_stats = state["missingQuarterStats"]
+        parser.lineups = [(side, tuple(start), *end, tuple(players)) for side, start, *end, players in state["lineups"]]
+        parser.lineup_starts = [start and tuple(start) for start in state["lineupStarts"]]
+        parser.events_applied = state["eventsApplied"]
+        parser.last_event = state["lastEvent"]
+        parser.touched_events = None
+        return parser
+
+
+def _settle(teams, side, player, mark, differential, quarter):
+    # Credit a player the change of the score differential since `mark`, in `quarter`
+    change = differential - mark if side == 0 else mark - differential
+    if change:
+        stats = teams[side].players[player]
+        stats.plusMinus += change
+        stats.quarters[quarter].plusMinus += change
+
+
+def _closed_minutes(stats):
+    # Minutes of a player's quarter with a stint still on court closed at the end of the period
+    in_time = stats.inTime
+    return stats.minutesPlayed if in_time is None else stats.minutesPlayed + PERIOD_MINUTES - in_time
+
+
+def _slots_state(obj, exclude=None):
+    return {name: getattr(obj, name) for name in obj.__slots__ if name != exclude}
+
+
+def _from_slots_state(cls, state):
+    obj = cls()
+    for name, value in state.items():
+        setattr(obj, name, value)
+    return obj
+
+
+def parse_events(events: List[Dict[str, Union[str, int]]]) -> GameStats:
+    return GameParser().apply(events)._finish()
@@ -0,0 +1,202 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ledger import DEAD
+from metrics import get_metrics
+from parse import parse_events
+from profiling import get_profiler
+
+# Marks the end of the input for a stage worker
+_DONE = object()
+
+
+class PipelineStats:
+    """
+    Thread-safe counters for a pipeline run.
+    """
+    def __init__(self):
+        self.processed = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record_success(self):
+        with self._lock:
+            self.processed += 1
+            return self.processed
+
+    def record_failure(self):
+        with self._lock:
+            self.failed += 1
+
+    def record_uncommitted(self):
+        """
+        Count a game that was written, but whose batch failed to commit, as failed.
+        """
+        with self._lock:
+            self.processed -= 1
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def games_per_second(self):
+        elapsed = self.elapsed()
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def report(self):
+        print(
+            f"Processed {self.processed} games ({self.failed} failed) in {self.elapsed():.1f}s: "
+            f"{self.games_per_second():.2f} games/s"
+        )
+
+
+def _run_stage(name, in_queue, out_queue, workers, handle):
+    """
+    Start `workers` threads that take items from `in_queue`, run `handle` on them
+    and put non-None results on `out_queue`. Returns the started threads.
+    """
+    metrics = get_metrics()
+
+    def worker():
+        while True:
+            item = in_queue.get()
+            metrics.set("pipeline_queue_depth", in_queue.qsize(), queue=name)
+            if item is _DONE:
+                break
+            try:
+                result = handle(item)
+            except Exception as e:
+                # e.g. the ledger failing while recording an error; a dead worker would
+                # leave the queues blocked forever
+                print(f"Error in {name} worker: {e}")
+                metrics.error(name, e)
+                continue
+            if result is not None and out_queue is not None:
+                # Blocks while the next stage is full, which gives us backpressure
+                out_queue.put(result)
+
+    threads = [threading.Thread(target=worker, name=f"{name}-{i}", daemon=True) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def _finish_stage(threads, out_queue, downstream_workers):
+    """
+    Wait for a stage to drain and tell every worker of the next stage to stop.
+    """
+    for thread in threads:
+        thread.join()
+    if out_queue is not None:
+        for _ in range(downstream_workers):
+            out_queue.put(_DONE)
+
+
+def run_pipeline(guids, fetchers, write, fetch_workers=4, write_workers=2,
+                 queue_size=32, report_every=50, ledger=None, cache=None, offline=False):
+    """
+    Process games through separate fetch, parse and write stages connected by bounded queues.
+    Fetching and writing wait on the network and the database and run in several threads each;
+    parsing is pure Python, which threads can't run in parallel, so one thread parses.
+
+    `fetchers` is a (fetch_game_details, fetch_game_players, fetch_game_events) tuple and
+    `write` is called as write(game_players, game_events, game_details, on_commit, raw_events, on_failure),
+    where `on_commit` must be called once the game is durably stored and `on_failure` with the
+    error when a game that `write` accepted is not stored after all.
+    The three fetches for a game are issued concurrently unless the game is in `cache`.
+    Finished and failed GUIDs are recorded in `ledger` when one is given.
+
+    Returns the PipelineStats; the last batches are only committed when the writer is closed,
+    so call its `report` after that.
+    """
+    fetch_game_details, fetch_game_players, fetch_game_events = fetchers
+    stats = PipelineStats()
+    metrics = get_metrics()
+    profiler = get_profiler()
+
+    fetch_queue = queue.Queue(maxsize=queue_size)
+    parse_queue = queue.Queue(maxsize=queue_size)
+    write_queue = queue.Queue(maxsize=queue_size)
+
+    def record_error(guid, e, stage):
+        stats.record_failure()
+        print(f"Error processing GUID {guid}: {e}")
+        metrics.error(stage, e)
+        metrics.log("game_failed", guid=guid, stage=stage, error_class=type(e).__name__, error=str(e))
+        dead = ledger is not None and ledger.mark_failed(guid, e) == DEAD
+        metrics.inc("games_total", outcome="dead" if dead else "failed")
+        if dead:
+            print(f"Giving up on GUID {guid}, see `python3 src/ledger.py dead`")
+
+    # Shared by all fetch workers so each game can have its three requests in flight at once
+    request_pool = ThreadPoolExecutor(max_workers=fetch_workers * 3, thread_name_prefix="request")
+
+    def fetch(guid):
+        try:
+            if cache is not None:
+                cached = cache.get_game(guid)
+                if cached is not None:
+                    return (guid,) + cached
+            if offline:
+                raise LookupError(f"Game {guid} is not in the response cache")
+
+            details = request_pool.submit(fetch_game_details, guid)
+            players = request_pool.submit(fetch_game_players, guid)
+            events = request_pool.submit(fetch_game_events, guid)
+            game = details.result(), players.result(), events.result()
+            if cache is not None:
+                cache.put_game(guid, *game)
+            return (guid,) + game
+        except Exception as e:
+            record_error(guid, e, "fetch")
+            return None
+
+    def parse(item):
+        guid, game_details, game_players, raw_events = item
+        try:
+            with metrics.timer("parse_seconds"), profiler.capture(guid, "parse", item[1:]):
+                game_events = parse_events(raw_events)
+            metrics.inc("parse_events_total", len(raw_events))
+            return guid, game_details, game_players, game_events, raw_events
+        except Exception as e:
+            record_error(guid, e, "parse")
+            return None
+
+    def store(item):
+        guid, game_details, game_players, game_events, raw_events = item
+        on_commit = (lambda: ledger.mark_done(guid)) if ledger is not None else None
+
+        def on_failure(e):
+            stats.record_uncommitted()
+            record_error(guid, e, "write")
+
+        try:
+            with profiler.capture(guid, "write", (game_details, game_players, raw_events)):
+                write(game_players, game_events, game_details, on_commit, raw_events, on_failure)
+        except Exception as e:
+            record_error(guid, e, "write")
+            return None
+
+        processed = stats.record_success()
+        if report_every and processed % report_every == 0:
+            print(f"Processed {processed} games ({stats.games_per_second():.2f} games/s)")
+        return None
+
+    fetch_threads = _run_stage("fetch", fetch_queue, parse_queue, fetch_workers, fetch)
+    parse_threads = _run_stage("parse", parse_queue, write_queue, 1, parse)
+    write_threads = _run_stage("write", write_queue, None, write_workers, store)
+
+    try:
+        for guid in guids:
+            fetch_queue.put(guid)
+        for _ in range(fetch_workers):
+            fetch_queue.put(_DONE)
+
+        _finish_stage(fetch_threads, parse_queue, 1)
+        _finish_stage(parse_threads, write_queue, write_workers)
+        _finish_stage(write_threads, None, 0)
+    finally:
+        request_pool.shutdown(wait=False)
+    return stats
@@ -0,0 +1,142 @@
+import cProfile
+import datetime
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+PROFILE_DIR = "./src/profiles"
+# Frames kept per allocation by tracemalloc
+TRACEMALLOC_FRAMES = 10
+
+
+class SlowGameProfiler:
+    """
+    Profiles every game stage and keeps the capture of the ones slower than `threshold` seconds.
+
+    A kept capture is a directory under `directory` holding the game's raw payloads
+    (game.json), the cProfile dump (<stage>.pstats) with a summary of the top functions
+    (<stage>.txt), and a tracemalloc snapshot (<stage>.tracemalloc) with its top allocation
+    sites (<stage>-memory.txt). Without a threshold nothing is profiled.
+
+    tracemalloc is process-wide, so with several worker threads the memory numbers of a
+    stage include what the other threads allocated at the same time.
+    """
+    def __init__(self, threshold=None, directory=PROFILE_DIR, top=25):
+        self.threshold = threshold
+        self.directory = directory
+        self.top = top
+        if threshold is not None and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    @contextmanager
+    def capture(self, guid, stage, game):
+        """
+        Profile the block that runs `stage` ("parse" or "write") of a game, where `game` is
+        its (game_details, game_players, raw_events).
+        """
+        if self.threshold is None:
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active in this process
+            profiler = None
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            if profiler is not None:
+                profiler.disable()
+            if elapsed >= self.threshold:
+                try:
+                    path = self.save(guid, stage, game, elapsed, profiler)
+                    print(f"{stage} of GUID {guid} took {elapsed:.2f}s, profile saved to {path}")
+                except OSError as e:
+                    print(f"Could not save the profile of GUID {guid}: {e}")
+
+    def save(self, guid, stage, game, elapsed, profiler):
+        path = os.path.join(self.directory, guid)
+        os.makedirs(path, exist_ok=True)
+
+        game_path = os.path.join(path, "game.json")
+        if not os.path.exists(game_path):
+            game_details, game_players, raw_events = game
+            with open(game_path, "w") as file:
+                json.dump({"game_details": game_details, "game_players": game_players, "raw_events": raw_events}, file)
+
+        summary = [
+            f"GUID {guid}, {stage} took {elapsed:.3f}s on {datetime.datetime.now().isoformat(timespec='seconds')}",
+            f"{len(game[2])} raw events",
+        ]
+        if profiler is not None:
+            profiler.dump_stats(os.path.join(path, f"{stage}.pstats"))
+            summary.append(top_functions(profiler, self.top))
+        with open(os.path.join(path, f"{stage}.txt"), "w") as file:
+            file.write("\n".join(summary) + "\n")
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        snapshot.dump(os.path.join(path, f"{stage}.tracemalloc"))
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"traced memory: {current / 1024 ** 2:.1f} MB, peak {peak / 1024 ** 2:.1f} MB"]
+        lines += [str(statistic) for statistic in snapshot.statistics("lineno")[:self.top]]
+        with open(os.path.join(path, f"{stage}-memory.txt"), "w") as file:
+            file.write("\n".join(lines) + "\n")
+        return path
+
+
+def top_functions(profile, count=25):
+    """
+    The `count` functions with the highest cumulative time, as printed by pstats.
+    """
+    output = io.StringIO()
+    pstats.Stats(profile, stream=output).sort_stats("cumulative").print_stats(count)
+    return output.getvalue()
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler() -> SlowGameProfiler:
+    """
+    Return the process-wide profiler. It only profiles when PROFILE_SLOW_GAMES_SECONDS is set,
+    saving captures under PROFILE_DIR.
+    """
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            threshold = os.getenv("PROFILE_SLOW_GAMES_SECONDS")
+            _profiler = SlowGameProfiler(
+                float(threshold) if threshold else None,
+                os.getenv("PROFILE_DIR", PROFILE_DIR),
+            )
+        return _profiler
+
+
+if __name__ == "__main__":
+    # Re-parse a captured game under the profiler: python3 src/profiling.py src/profiles/<guid>
+    from parse import parse_events
+
+    if len(sys.argv) != 2:
+        print("Usage: python3 src/profiling.py PROFILE_DIRECTORY")
+        sys.exit(1)
+
+    with open(os.path.join(sys.argv[1], "game.json")) as file:
+        raw_events = json.load(file)["raw_events"]
+
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.runcall(parse_events, raw_events)
+    print(f"Parsed {len(raw_events)} events in {time.perf_counter() - started:.3f}s")
+    print(top_functions(profiler))
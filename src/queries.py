@@ -0,0 +1,146 @@
+from datetime import date
+
+# Game logs are ordered by (date, game_guid); games without a date sort as this day
+UNKNOWN_DATE = date(1, 1, 1)
+
+PLAYER_GAME_COLUMNS = (
+    "game_guid", "date", "poule_guid", "poule_name", "team_guid", "opponent_guid", "opponent_name",
+    "home", "score", "total_points", "one_pointers", "two_pointers", "three_pointers", "fouls",
+    "total_minutes", "plus_minus",
+)
+
+
+def _rows(cursor):
+    columns = [column.name for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def player_summary(cursor, player_guid):
+    """
+    A player's name, birthdate, games played and running sums and averages, or None.
+    """
+    cursor.execute("SELECT * FROM Players WHERE player_guid = %s", (player_guid,))
+    rows = _rows(cursor)
+    return rows[0] if rows else None
+
+
+def encode_page_token(row):
+    return f"{(row['date'] or UNKNOWN_DATE).isoformat()}|{row['game_guid']}"
+
+
+def decode_page_token(token):
+    """
+    (date, game_guid) of a page token, raises ValueError for a malformed one.
+    """
+    day, _, game_guid = token.partition("|")
+    if not game_guid:
+        raise ValueError(f"Malformed page token {token!r}")
+    return date.fromisoformat(day), game_guid
+
+
+def player_game_log(cursor, player_guid, limit=20, before=None):
+    """
+    One page of a player's games, newest first. `before` is the `next` token of the previous
+    page. Pages are keyed on (date, game_guid) rather than an offset, so a game written
+    between two requests doesn't shift or repeat rows.
+    """
+    conditions = ["pg.player_guid = %s"]
+    parameters = [player_guid]
+    if before is not None:
+        before_date, before_guid = decode_page_token(before)
+        conditions.append("(COALESCE(g.date, %s), g.game_guid) < (%s, %s)")
+        parameters += [UNKNOWN_DATE, before_date, before_guid]
+
+    cursor.execute(f"""
+        SELECT
+            g.game_guid, g.date, g.poule_guid, g.poule_name, pg.team_guid,
+            CASE WHEN pg.team_guid = g.home_team_guid THEN g.away_team_guid ELSE g.home_team_guid END AS opponent_guid,
+            CASE WHEN pg.team_guid = g.home_team_guid THEN g.away_team_name ELSE g.home_team_name END AS opponent_name,
+            pg.team_guid = g.home_team_guid AS home, g.score,
+            pg.total_points, pg.one_pointers, pg.two_pointers, pg.three_pointers, pg.fouls,
+            pg.total_minutes, pg.plus_minus
+        FROM PlayerGames pg
+        JOIN Games g ON g.game_guid = pg.game_guid
+        WHERE {" AND ".join(conditions)}
+        ORDER BY COALESCE(g.date, %s) DESC, g.game_guid DESC
+        LIMIT %s
+    """, parameters + [UNKNOWN_DATE, limit + 1])
+    games = _rows(cursor)
+
+    page = {"games": games[:limit], "next": None}
+    if len(games) > limit:
+        page["next"] = encode_page_token(games[limit - 1])
+    return page
+
+
+def box_score(cursor, game_guid):
+    """
+    A game with, per team, its players' lines and its quarter totals, or None.
+    """
+    cursor.execute("""
+        SELECT game_guid, date, start_time, poule_guid, poule_name, home_team_guid, home_team_name,
+               away_team_guid, away_team_name, score
+        FROM Games WHERE game_guid = %s
+    """, (game_guid,))
+    games = _rows(cursor)
+    if not games:
+        return None
+    game = games[0]
+
+    cursor.execute("""
+        SELECT pg.team_guid, pg.player_guid, p.name, pg.total_points, pg.one_pointers, pg.two_pointers,
+               pg.three_pointers, pg.fouls, pg.total_minutes, pg.plus_minus
+        FROM PlayerGames pg
+        JOIN Players p ON p.player_guid = pg.player_guid
+        WHERE pg.game_guid = %s
+        ORDER BY pg.total_points DESC, p.name
+    """, (game_guid,))
+    players = _rows(cursor)
+
+    cursor.execute("""
+        SELECT team_guid, quarter, total_points, one_pointers, two_pointers, three_pointers, fouls
+        FROM Quarters WHERE game_guid = %s ORDER BY quarter
+    """, (game_guid,))
+    quarters = _rows(cursor)
+
+    game["teams"] = []
+    for side in ("home", "away"):
+        team_guid = game[f"{side}_team_guid"]
+        game["teams"].append({
+            "team_guid": team_guid,
+            "team_name": game[f"{side}_team_name"],
+            "players": [{k: v for k, v in row.items() if k != "team_guid"} for row in players if row["team_guid"] == team_guid],
+            "quarters": [{k: v for k, v in row.items() if k != "team_guid"} for row in quarters if row["team_guid"] == team_guid],
+        })
+    return game
+
+
+def top_scorers(cursor, poule_guid, limit=10):
+    """
+    The players with the most points per game in a poule.
+    """
+    cursor.execute("""
+        SELECT pg.player_guid, p.name, pg.team_guid, COUNT(*) AS games, SUM(pg.total_points) AS total_points,
+               ROUND(AVG(pg.total_points), 2)::float AS avg_points,
+               SUM(pg.three_pointers) AS three_pointers, SUM(pg.fouls) AS fouls
+        FROM PlayerGames pg
+        JOIN Games g ON g.game_guid = pg.game_guid
+        JOIN Players p ON p.player_guid = pg.player_guid
+        WHERE g.poule_guid = %s
+        GROUP BY pg.player_guid, p.name, pg.team_guid
+        ORDER BY avg_points DESC, total_points DESC, pg.player_guid
+        LIMIT %s
+    """, (poule_guid, limit))
+    return _rows(cursor)
+
+
+def standings(cursor, poule_guid):
+    """
+    The Standings rows of a poule, best record first.
+    """
+    cursor.execute("""
+        SELECT team_guid, team_name, played, won, lost, points_for, points_against, differential, streak, last_game_date
+        FROM Standings WHERE poule_guid = %s
+        ORDER BY won DESC, differential DESC, team_name
+    """, (poule_guid,))
+    return _rows(cursor)
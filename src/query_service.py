@@ -0,0 +1,321 @@
+from write_to_postgres import GAME_WRITTEN_CHANNEL
+from metrics import get_metrics
+import queries
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+import argparse
+import json
+import os
+import re
+import select
+import threading
+import time
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+from dotenv import load_dotenv
+
+MAX_PAGE_SIZE = 100
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve player, game and poule queries over HTTP with a result cache.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--cache-size", type=int, default=int(os.getenv("QUERY_CACHE_SIZE", "2048")),
+                        help="results kept in memory")
+    parser.add_argument("--cache-ttl", type=float, default=float(os.getenv("QUERY_CACHE_TTL", "300")),
+                        help="seconds a result is served without asking PostgreSQL again")
+    parser.add_argument("--pool-size", type=int, default=4, help="PostgreSQL connections for queries")
+    return parser.parse_args()
+
+
+class ResultCache:
+    """
+    LRU cache of query results with a time-to-live, where every entry is tagged with the
+    player, team, game and poule keys it was computed from.
+
+    `invalidate` drops exactly the entries carrying one of the given tags. A result computed
+    while one of its tags was invalidated is not stored, so a query that raced a write can't
+    put a stale result back: take `versions(tags)` before querying and pass them to `put`.
+    """
+    def __init__(self, max_entries=2048, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.keys_by_tag = {}
+        self.tag_versions = {}
+        self.epoch = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return (True, result) for a fresh entry, otherwise (False, None).
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return False, None
+            expires, result, _ = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                return False, None
+            self.entries.move_to_end(key)
+            return True, result
+
+    def versions(self, tags):
+        with self._lock:
+            return self.epoch, tuple(self.tag_versions.get(tag, 0) for tag in tags)
+
+    def put(self, key, result, tags, versions):
+        with self._lock:
+            if versions != (self.epoch, tuple(self.tag_versions.get(tag, 0) for tag in tags)):
+                return
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (time.monotonic() + self.ttl, result, tags)
+            for tag in tags:
+                self.keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+
+    def invalidate(self, tags):
+        """
+        Drop the entries tagged with any of `tags`. Returns how many were dropped.
+        """
+        dropped = 0
+        with self._lock:
+            for tag in tags:
+                self.tag_versions[tag] = self.tag_versions.get(tag, 0) + 1
+                for key in self.keys_by_tag.pop(tag, ()):
+                    if key in self.entries:
+                        self._remove(key)
+                        dropped += 1
+        return dropped
+
+    def clear(self):
+        with self._lock:
+            self.epoch += 1
+            self.tag_versions.clear()
+            self.entries.clear()
+            self.keys_by_tag.clear()
+
+    def _remove(self, key):
+        _, _, tags = self.entries.pop(key)
+        for tag in tags:
+            keys = self.keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.keys_by_tag[tag]
+
+
+def tags_of_write(payload):
+    """
+    Cache tags touched by a game_written notification, or None when everything may have changed.
+    """
+    if payload.get("all"):
+        return None
+    tags = [f"game:{payload['game']}"]
+    tags += [f"team:{team}" for team in payload.get("teams", []) if team]
+    tags += [f"player:{player}" for player in payload.get("players", []) if player]
+    if payload.get("poule"):
+        tags.append(f"poule:{payload['poule']}")
+    return tags
+
+
+def listen_for_writes(db_config, cache, stopping, reconnect_delay=5):
+    """
+    Invalidate `cache` for every game_written notification until `stopping` is set. While
+    the connection is down notifications are lost, so the whole cache is cleared on (re)connect.
+    """
+    metrics = get_metrics()
+    while not stopping.is_set():
+        conn = None
+        try:
+            conn = psycopg2.connect(**db_config)
+            conn.autocommit = True
+            conn.cursor().execute(f"LISTEN {GAME_WRITTEN_CHANNEL}")
+            cache.clear()
+            while not stopping.is_set():
+                if select.select([conn], [], [], 1) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        tags = tags_of_write(json.loads(notify.payload))
+                    except (ValueError, KeyError):
+                        tags = None
+                    if tags is None:
+                        cache.clear()
+                    else:
+                        metrics.inc("query_cache_invalidations_total", cache.invalidate(tags))
+        except (psycopg2.Error, OSError) as e:
+            print(f"Lost the notification connection: {e}")
+            stopping.wait(reconnect_delay)
+        finally:
+            if conn is not None:
+                conn.close()
+
+
+class QueryService:
+    """
+    Runs the functions of queries.py on pooled connections, serving repeated requests from the cache.
+    """
+    def __init__(self, db_config, cache, pool_size=4):
+        self.cache = cache
+        self.pool = ThreadedConnectionPool(1, pool_size, **db_config)
+
+    def run(self, name, tags, query, *args):
+        metrics = get_metrics()
+        key = (name,) + args
+        hit, result = self.cache.get(key)
+        metrics.inc("query_cache_total", query=name, result="hit" if hit else "miss")
+        if hit:
+            return result, True
+
+        versions = self.cache.versions(tags)
+        conn = self.pool.getconn()
+        try:
+            with metrics.timer("query_seconds", query=name), conn.cursor() as cursor:
+                result = query(cursor, *args)
+        finally:
+            # Queries only read; end the transaction so the connection doesn't sit idle in one.
+            # A broken connection is closed instead of going back into the pool.
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    conn.close()
+            self.pool.putconn(conn, close=bool(conn.closed))
+        self.cache.put(key, result, tags, versions)
+        return result, False
+
+    def close(self):
+        self.pool.closeall()
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _int_parameter(parameters, name, default, low, high):
+    value = int(parameters.get(name, default))
+    if not low <= value <= high:
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return value
+
+
+def route(service, path, parameters):
+    """
+    Answer a GET request: (result, cache hit), raising LookupError for an unknown path.
+    """
+    match = re.fullmatch(r"/players/([^/]+)", path)
+    if match:
+        guid = match.group(1)
+        return service.run("player_summary", (f"player:{guid}",), queries.player_summary, guid)
+
+    match = re.fullmatch(r"/players/([^/]+)/games", path)
+    if match:
+        guid = match.group(1)
+        limit = _int_parameter(parameters, "limit", 20, 1, MAX_PAGE_SIZE)
+        before = parameters.get("before")
+        if before is not None:
+            queries.decode_page_token(before)
+        return service.run("player_game_log", (f"player:{guid}",), queries.player_game_log, guid, limit, before)
+
+    match = re.fullmatch(r"/games/([^/]+)/box-score", path)
+    if match:
+        guid = match.group(1)
+        return service.run("box_score", (f"game:{guid}",), queries.box_score, guid)
+
+    match = re.fullmatch(r"/poules/([^/]+)/top-scorers", path)
+    if match:
+        guid = match.group(1)
+        limit = _int_parameter(parameters, "limit", 10, 1, MAX_PAGE_SIZE)
+        return service.run("top_scorers", (f"poule:{guid}",), queries.top_scorers, guid, limit)
+
+    match = re.fullmatch(r"/poules/([^/]+)/standings", path)
+    if match:
+        guid = match.group(1)
+        return service.run("standings", (f"poule:{guid}",), queries.standings, guid)
+
+    raise LookupError(path)
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload, cache=None):
+            body = json.dumps(payload, default=_json_default).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if cache is not None:
+                self.send_header("X-Cache", "hit" if cache else "miss")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            parameters = {name: values[0] for name, values in parse_qs(url.query).items()}
+            try:
+                result, hit = route(service, url.path.rstrip("/"), parameters)
+            except LookupError:
+                self._send_json(404, {"error": "unknown path"})
+                return
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            except psycopg2.Error as e:
+                print(f"Query failed: {e}")
+                get_metrics().error("query", e)
+                self._send_json(500, {"error": "query failed"})
+                return
+
+            if result is None:
+                self._send_json(404, {"error": "not found"}, hit)
+            else:
+                self._send_json(200, result, hit)
+
+    return Handler
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    args = parse_args()
+
+    db_config = {
+        "dbname": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "host": os.getenv("DB_HOST"),
+        "port": os.getenv("DB_PORT")
+    }
+
+    cache = ResultCache(args.cache_size, args.cache_ttl)
+    service = QueryService(db_config, cache, args.pool_size)
+    stopping = threading.Event()
+    listener = threading.Thread(target=listen_for_writes, args=(db_config, cache, stopping), name="listener", daemon=True)
+    listener.start()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    server.daemon_threads = True
+    print(f"Serving queries on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stopping.set()
+        server.server_close()
+        service.close()
@@ -0,0 +1,42 @@
+from write_to_postgres import initialize_database, notify_game_written, rebuild_player_aggregates, rebuild_standings
+import argparse
+import os
+import psycopg2
+from dotenv import load_dotenv
+
+REBUILDS = {
+    "players": rebuild_player_aggregates,
+    "standings": rebuild_standings,
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Recompute derived tables from the stored games.")
+    parser.add_argument("tables", nargs="+", choices=sorted(REBUILDS), help="derived tables to rebuild")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    load_dotenv()
+
+    db_config = {
+        "dbname": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "host": os.getenv("DB_HOST"),
+        "port": os.getenv("DB_PORT")
+    }
+
+    initialize_database(db_config)
+    conn = psycopg2.connect(**db_config)
+    try:
+        cursor = conn.cursor()
+        for table in args.tables:
+            REBUILDS[table](cursor)
+            print(f"Rebuilt {table}")
+        # Cached query results may depend on any of the rebuilt rows
+        notify_game_written(cursor)
+        conn.commit()
+    finally:
+        conn.close()
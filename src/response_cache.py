@@ -0,0 +1,220 @@
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_DIR = "./src/cache"
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+GAME_ENDPOINTS = ("MatchByWedGuid", "DwfDeelByWedGuid", "DwfVgngByWedGuid")
+
+# Access times buffered in memory before they are written to the index in one transaction
+ACCESS_FLUSH_SIZE = 1000
+
+
+class ResponseCache:
+    """
+    Compressed, content-addressed on-disk cache of raw VBL responses keyed by endpoint and WedGUID.
+
+    Payloads are stored gzipped under the sha256 of their JSON, so identical responses share a file.
+    An SQLite index keeps the last access time of every entry and the least recently used
+    entries are evicted once the blobs grow past `max_bytes`. Reads only buffer their access
+    time; the buffer is written by `put`, every ACCESS_FLUSH_SIZE reads and by `close`.
+    """
+    def __init__(self, path=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(path, "objects"), exist_ok=True)
+
+        self.conn = sqlite3.connect(os.path.join(path, "index.sqlite"), check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS entries (
+                endpoint TEXT NOT NULL,
+                guid TEXT NOT NULL,
+                digest TEXT NOT NULL REFERENCES blobs(digest),
+                last_access REAL NOT NULL,
+                PRIMARY KEY (endpoint, guid)
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+            CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest);
+        """)
+        self.conn.commit()
+        self._accessed = {}  # (endpoint, guid) -> last access not yet in the index
+        self._total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def _blob_path(self, digest):
+        return os.path.join(self.path, "objects", digest[:2], digest + ".json.gz")
+
+    def get(self, endpoint, guid):
+        """
+        Return the cached payload for an endpoint and GUID, or None.
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT digest FROM entries WHERE endpoint = ? AND guid = ?", (endpoint, guid)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            with gzip.open(self._blob_path(row[0]), "rb") as f:
+                payload = json.loads(f.read())
+        except FileNotFoundError:
+            with self._lock:
+                self.conn.execute(
+                    "DELETE FROM entries WHERE endpoint = ? AND guid = ? AND digest = ?", (endpoint, guid, row[0])
+                )
+                self.conn.commit()
+            return None
+
+        with self._lock:
+            self._accessed[(endpoint, guid)] = time.time()
+            if len(self._accessed) >= ACCESS_FLUSH_SIZE:
+                self._flush_accessed()
+                self.conn.commit()
+        return payload
+
+    def _flush_accessed(self):
+        self.conn.executemany(
+            "UPDATE entries SET last_access = ? WHERE endpoint = ? AND guid = ?",
+            ((accessed, endpoint, guid) for (endpoint, guid), accessed in self._accessed.items())
+        )
+        self._accessed.clear()
+
+    def put(self, endpoint, guid, payload):
+        """
+        Store a payload and evict old entries if the cache is over its size cap.
+        """
+        data = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(digest)
+
+        with self._lock:
+            if not os.path.exists(blob_path):
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                tmp_path = f"{blob_path}.{threading.get_ident()}.tmp"
+                with gzip.open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, blob_path)
+            size = os.path.getsize(blob_path)
+            if self.conn.execute("INSERT OR IGNORE INTO blobs (digest, size) VALUES (?, ?)", (digest, size)).rowcount:
+                self._total_bytes += size
+            previous = self.conn.execute(
+                "SELECT digest FROM entries WHERE endpoint = ? AND guid = ?", (endpoint, guid)
+            ).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (endpoint, guid, digest, last_access) VALUES (?, ?, ?, ?)",
+                (endpoint, guid, digest, time.time())
+            )
+            self._accessed.pop((endpoint, guid), None)
+            if previous and previous[0] != digest:
+                self._drop_blob_if_unused(previous[0])
+            self._flush_accessed()
+            self._evict()
+            self.conn.commit()
+
+    def _drop_blob_if_unused(self, digest):
+        in_use = self.conn.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+        if in_use:
+            return
+        row = self.conn.execute("SELECT size FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if row is None:
+            return
+        self.conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+        self._total_bytes -= row[0]
+        try:
+            os.remove(self._blob_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        """
+        Remove least recently used entries until the blobs fit in `max_bytes`.
+        """
+        while self._total_bytes > self.max_bytes:
+            oldest = self.conn.execute(
+                "SELECT endpoint, guid, digest FROM entries ORDER BY last_access LIMIT 1"
+            ).fetchone()
+            if oldest is None:
+                break
+            endpoint, guid, digest = oldest
+            self.conn.execute("DELETE FROM entries WHERE endpoint = ? AND guid = ?", (endpoint, guid))
+            self._drop_blob_if_unused(digest)
+
+    def get_game(self, guid):
+        """
+        Return the cached (game_details, game_players, game_events) of a game, or None if any part is missing.
+        """
+        game = tuple(self.get(endpoint, guid) for endpoint in GAME_ENDPOINTS)
+        if any(payload is None for payload in game):
+            return None
+        return game
+
+    def put_game(self, guid, game_details, game_players, game_events):
+        """
+        Cache the three payloads of a game once it has a final score; live games still change.
+        """
+        if not game_details.get("uitslag"):
+            return False
+        for endpoint, payload in zip(GAME_ENDPOINTS, (game_details, game_players, game_events)):
+            self.put(endpoint, guid, payload)
+        return True
+
+    def game_guids(self):
+        """
+        GUIDs of all games that are completely cached.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT guid FROM entries GROUP BY guid HAVING COUNT(DISTINCT endpoint) = ? ORDER BY guid",
+                (len(GAME_ENDPOINTS),)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        with self._lock:
+            if self.conn is None:
+                return
+            self._flush_accessed()
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
+
+
+def get_cache():
+    """
+    Open the cache configured through RESPONSE_CACHE_DIR and RESPONSE_CACHE_MAX_MB.
+    """
+    path = os.getenv("RESPONSE_CACHE_DIR", CACHE_DIR)
+    max_mb = os.getenv("RESPONSE_CACHE_MAX_MB")
+    max_bytes = int(max_mb) * 1024 ** 2 if max_mb else DEFAULT_MAX_BYTES
+    cache = ResponseCache(path, max_bytes)
+    atexit.register(cache.close)
+    return cache
+
+
+def load_game(guid, fetchers, cache=None, offline=False):
+    """
+    Return (game_details, game_players, game_events) for a game, from the cache when possible.
+    In offline mode a cache miss raises LookupError instead of hitting the API.
+    """
+    if cache is not None:
+        cached = cache.get_game(guid)
+        if cached is not None:
+            return cached
+    if offline:
+        raise LookupError(f"Game {guid} is not in the response cache")
+
+    fetch_game_details, fetch_game_players, fetch_game_events = fetchers
+    game = fetch_game_details(guid), fetch_game_players(guid), fetch_game_events(guid)
+    if cache is not None:
+        cache.put_game(guid, *game)
+    return game
@@ -1,55 +1,74 @@
-import requests
 from parse import parse_events
-from write_to_postgres import write_to_postgres
-from write_to_sqlite import write_to_sqlite
+from write_to_postgres import PostgresWriter
+from write_to_sqlite import SqliteWriter
+from pipeline import run_pipeline
+from response_cache import get_cache, load_game
+from ledger import DEAD, get_ledger
+from metrics import get_metrics
+from profiling import get_profiler
+from vbl_client import fetch_game_details, fetch_game_players, fetch_game_events
+import argparse
 import os
 from dotenv import load_dotenv
 
-AUTH_HEADER = "Basic YmFza2V0amFhbkBnbWFpbC5jb206YmFza2V0MjM6QjA5QjBFNDAtMTE2OC00RD8hCLUIzQ0QtOTI8MUVDMzdCMjg3"
 
-req_headers = {
-    "Authorization": AUTH_HEADER,
-    "Content-Type": "application/json; charset=UTF-8",
-}
+def parse_args():
+    parser = argparse.ArgumentParser(description="Insert the already played games into the database.")
+    parser.add_argument("--input", default="./src/played_games.txt", help="file with one game GUID per line")
+    parser.add_argument("--pipeline", action="store_true", help="fetch, parse and write games in concurrent stages")
+    parser.add_argument("--fetch-workers", type=int, default=4, help="games fetched at the same time in pipeline mode")
+    parser.add_argument("--write-workers", type=int, default=2, help="database writers in pipeline mode")
+    parser.add_argument("--queue-size", type=int, default=32, help="games buffered between pipeline stages")
+    parser.add_argument("--batch-size", type=int, default=20, help="games committed per PostgreSQL transaction")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or fill the on-disk response cache")
+    parser.add_argument("--offline", action="store_true", help="re-process every cached game without calling the API")
+    parser.add_argument("--sqlite", metavar="DB_PATH", help="write to this SQLite database instead of PostgreSQL")
+    parser.add_argument("--sqlite-batch-size", type=int, default=500, help="games committed per SQLite transaction")
+    return parser.parse_args()
 
-def fetch_game_details(guid):
-    req = requests.get("https://vblcb.wisseq.eu/VBLCB_WebService/data/MatchByWedGuid?issguid=" + guid)
-    req.raise_for_status()  # Raise an exception for HTTP errors
-    return req.json()[0]["doc"]
 
-def fetch_game_players(guid):
-    req_body = {
-        "AuthHeader": AUTH_HEADER,
-        "WQVer": "v.5b",
-        "CRUD": "R",
-        "RelNr": "v.5b",
-        "WedGUID": guid
-    }
-    response = requests.put("https://vblcb.wisseq.eu/VBLCB_WebService/data/DwfDeelByWedGuid", headers=req_headers, json=req_body)
-    response.raise_for_status()
-    data = response.json()
-    return data
+def process_games(guids, write, ledger, cache, offline):
+    fetchers = (fetch_game_details, fetch_game_players, fetch_game_events)
+    metrics = get_metrics()
+    profiler = get_profiler()
 
-def fetch_game_events(guid):
-    req_body = {
-        "AuthHeader": AUTH_HEADER,
-        "WQVer": "v.5b",
-        "CRUD": "R",
-        "RelNr": "v.5b",
-        "WedGUID": guid
-    }
-    response = requests.put("https://vblcb.wisseq.eu/VBLCB_WebService/data/DwfVgngByWedGuid", headers=req_headers, json=req_body)
-    response.raise_for_status()
-    data = response.json()
-    events = data["GebNis"]
+    def fail(guid, stage, e):
+        print(f"Error processing GUID {guid}: {e}")
+        metrics.error(stage, e)
+        metrics.log("game_failed", guid=guid, stage=stage, error_class=type(e).__name__, error=str(e))
+        dead = ledger.mark_failed(guid, e) == DEAD
+        metrics.inc("games_total", outcome="dead" if dead else "failed")
+        if dead:
+            print(f"Giving up on GUID {guid}, see `python3 src/ledger.py dead`")
 
-    return events
+    for guid in guids:
+        stage = "fetch"
+        try:
+            print(f"Processing GUID: {guid}")
+            game_details, game_players, raw_events = load_game(guid, fetchers, cache, offline)
+            game = game_details, game_players, raw_events
+            stage = "parse"
+            with metrics.timer("parse_seconds"), profiler.capture(guid, "parse", game):
+                game_events = parse_events(raw_events)
+            metrics.inc("parse_events_total", len(raw_events))
+            stage = "write"
+            with profiler.capture(guid, "write", game):
+                write(game_players, game_events, game_details, lambda guid=guid: ledger.mark_done(guid), raw_events,
+                      lambda e, guid=guid: fail(guid, "write", e))
+            print(f"Successfully processed GUID: {guid}")
+        except Exception as e:
+            fail(guid, stage, e)
+            continue
 
 
 if __name__ == "__main__":
-    with open("./src/played_games.txt", "r") as file:
-        load_dotenv()
+    args = parse_args()
+    load_dotenv()
 
+    if args.sqlite:
+        writer = SqliteWriter(args.sqlite, batch_size=args.sqlite_batch_size)
+        write = writer.write
+    else:
         db_config = {
             "dbname": os.getenv("DB_NAME"),
             "user": os.getenv("DB_USER"),
@@ -57,18 +76,44 @@ if __name__ == "__main__":
             "host": os.getenv("DB_HOST"),
             "port": os.getenv("DB_PORT")
         }
+        writer = PostgresWriter(db_config, batch_size=args.batch_size, pool_size=max(args.write_workers, 1))
+        write = writer.write
 
-        for line in file:
-            guid = line.strip()
-            try:
-                print(f"Processing GUID: {guid}")
-                game_details = fetch_game_details(guid)
-                game_players = fetch_game_players(guid)
-                game_events = parse_events(fetch_game_events(guid))
-                write_to_postgres(game_players, game_events, game_details, db_config)
-                print(f"Successfully processed GUID: {guid}")
-            except Exception as e:
-                print(f"Error processing GUID {guid}: {e}")
-                with open("./src/error_games.txt", "a") as error_file:
-                    error_file.write(guid + "\n")
-                continue
+    cache = None if args.no_cache and not args.offline else get_cache()
+    ledger = get_ledger()
+
+    if args.offline:
+        guids = cache.game_guids()
+    else:
+        with open(args.input, "r") as file:
+            guids = [line.strip() for line in file if line.strip()]
+        # The ledger is the checkpoint journal: a restarted backfill skips finished and
+        # dead-lettered games in one lookup and picks up failed games once their backoff passed
+        ledger.add_pending(guids)
+        runnable = ledger.runnable(guids)
+        guids = [guid for guid in guids if guid in runnable]
+        retries = [guid for guid in ledger.due_for_retry() if guid not in runnable]
+        if retries:
+            print(f"Retrying {len(retries)} failed games")
+        guids += retries
+
+    stats = None
+    try:
+        if args.pipeline:
+            stats = run_pipeline(
+                guids,
+                (fetch_game_details, fetch_game_players, fetch_game_events),
+                write,
+                fetch_workers=args.fetch_workers,
+                write_workers=args.write_workers,
+                queue_size=args.queue_size,
+                ledger=ledger,
+                cache=cache,
+                offline=args.offline,
+            )
+        else:
+            process_games(guids, write, ledger, cache, args.offline)
+    finally:
+        writer.close()
+    if stats is not None:
+        stats.report()
@@ -1,78 +1,143 @@
-import requests
 from parse import parse_events
-from write_to_postgres import write_to_postgres
-from write_to_sqlite import write_to_sqlite
+from write_to_postgres import PostgresWriter
+from response_cache import get_cache, load_game
+from ledger import DEAD, get_ledger
+from metrics import get_metrics
+from profiling import get_profiler
+from vbl_client import fetch_game_details, fetch_game_players, fetch_game_events, fetch_region_listing, iter_region_matches
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import os
+import time
 from dotenv import load_dotenv
-import requests
 import datetime
 
-AUTH_HEADER = "Basic YmFza2V0amFhbkBnbWFpbC5jb206YmFza2V0MjM6QjA5QjBFNDAtMTE2OC00RD8hCLUIzQ0QtOTI8MUVDMzdCMjg3"
-
-req_headers = {
-    "Authorization": AUTH_HEADER,
-    "Content-Type": "application/json; charset=UTF-8",
-}
-
-def fetch_game_details(guid):
-    req = requests.get("https://vblcb.wisseq.eu/VBLCB_WebService/data/MatchByWedGuid?issguid=" + guid)
-    return req.json()[0]["doc"]
-
-def fetch_game_players(guid):
-    req_body = {
-        "AuthHeader": AUTH_HEADER,
-        "WQVer": "v.5b",
-        "CRUD": "R",
-        "RelNr": "v.5b",
-        "WedGUID": guid
-    }
-    response = requests.put("https://vblcb.wisseq.eu/VBLCB_WebService/data/DwfDeelByWedGuid", headers=req_headers, json=req_body)
-    response.raise_for_status()
-    data = response.json()
-    return data
-
-def fetch_game_events(guid):
-    req_body = {
-        "AuthHeader": AUTH_HEADER,
-        "WQVer": "v.5b",
-        "CRUD": "R",
-        "RelNr": "v.5b",
-        "WedGUID": guid
-    }
-    response = requests.put("https://vblcb.wisseq.eu/VBLCB_WebService/data/DwfVgngByWedGuid", headers=req_headers, json=req_body)
-    response.raise_for_status()
-    data = response.json()
-    events = data["GebNis"]
-
-    return events
-
-
 REGIONS = ["BVBL9180", "BVBL9100", "BVBL9110", "BVBL9120", "BVBL9130", "BVBL9140", "BVBL9150", "BVBL9170", "BVBL9160"]
-today = datetime.datetime.now().strftime("%d-%m-%Y")
-
-def check_games(region):
-    url = f"https://vblcb.wisseq.eu/VBLCB_WebService/data/MatchesByRegioPeriode?curRegio={region}&dtStart=0&dtEnd=999999999999999999"
-    response = requests.get(url)
-    response.raise_for_status()
-    data = response.json()
-    games = []
-    for game in data:
-        with open("./src/played_games.txt", "r") as f:
-            played_games = f.read().splitlines()
-            if game["uitslag"] != "" and game["datumString"] == today and not game["guid"] in played_games:
-                games.append(game["guid"])
-    return games
-
-def get_todays_played_game_guids():
-    result = []
-    for region in REGIONS:
-        games = check_games(region)
-        result.extend(games)
-
-    if len(result) == 0:
-        with open("./src/error_games.txt", "a") as f:
-            f.write("No games played yet on " + today + "\n")
-    return result
+
+# MatchesByRegioPeriode takes its window as epoch milliseconds
+def to_api_time(moment):
+    return int(moment.timestamp() * 1000)
+
+def game_start(game):
+    """
+    Start of a listed game from its datumString ("dd-mm-yyyy") and beginTijd ("hh.mm"), or None.
+    """
+    try:
+        return datetime.datetime.strptime(f"{game['datumString']} {game['beginTijd'].replace('.', ':')}", "%d-%m-%Y %H:%M")
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def check_games(region, ledger):
+    """
+    Return the finished games of a region since its watermark, the (guid, start time) of
+    its games without a result yet, and the region state to persist once those games are
+    written. When the listing is unchanged the unfinished games are those saved with the
+    region state, so a restarted daemon still knows when to poll.
+
+    The watermark is the start of the last day we polled, so a poll only asks for a
+    narrow window and games from a missed day are still picked up. The listing is
+    decoded as it streams in, keeping only the GUIDs of finished games. A region whose
+    listing has not changed since the previous poll is only skipped without downloading
+    when the server answers 304 to its ETag; otherwise the listing is downloaded and
+    decoded in full, and the hash of the body, which is only known at the end, merely
+    saves the ledger lookup and schedule update.
+    """
+    start_of_today = datetime.datetime.combine(datetime.date.today(), datetime.time.min)
+    end_of_today = start_of_today + datetime.timedelta(days=1)
+
+    state = ledger.region_state(region)
+    watermark = state["watermark"] if state else to_api_time(start_of_today)
+
+    response = fetch_region_listing(region, watermark, to_api_time(end_of_today), state and state["etag"], stream=True)
+    if response is None:
+        return [], state["upcoming"], None
+
+    digest = hashlib.sha256()
+    finished = []
+    upcoming = []
+    for game in iter_region_matches(response, fields=("guid", "uitslag", "datumString", "beginTijd"), digest=digest):
+        # A missing result comes through as None, which is not a finished game either
+        if game["uitslag"]:
+            finished.append(game["guid"])
+        else:
+            start = game_start(game)
+            if start is not None:
+                upcoming.append((game["guid"], start))
+    payload_hash = digest.hexdigest()
+    if state and state["payload_hash"] == payload_hash:
+        return [], state["upcoming"], None
+
+    new_state = (region, to_api_time(start_of_today), response.headers.get("ETag"), payload_hash, upcoming)
+    return finished, upcoming, new_state
+
+def get_todays_played_game_guids(ledger):
+    """
+    Return the GUIDs to process, the region states to persist once they are written,
+    and the (guid, start time) of unfinished games per region.
+    """
+    with ThreadPoolExecutor(max_workers=len(REGIONS)) as executor:
+        responses = list(executor.map(lambda region: check_games(region, ledger), REGIONS))
+    finished = [guid for games, _, _ in responses for guid in games]
+    region_states = [state for _, _, state in responses if state is not None]
+    upcoming = {region: starts for region, (_, starts, _) in zip(REGIONS, responses) if starts is not None}
+
+    # One lookup for the whole poll instead of one per game
+    runnable = ledger.runnable(finished)
+    result = [guid for guid in finished if guid in runnable]
+
+    if len(finished) == 0:
+        print("No new games played on " + datetime.datetime.now().strftime("%d-%m-%Y"))
+
+    # Games that failed on an earlier poll are retried here once their backoff passed
+    result += [guid for guid in ledger.due_for_retry() if guid not in runnable]
+    return result, region_states, upcoming
+
+def process_games(guids, writer, ledger, cache, stopping=None):
+    """
+    Fetch, parse and write `guids`. Returns True when every game was written, False
+    when one failed or `stopping` (a threading.Event) was set before the end.
+    """
+    fetchers = (fetch_game_details, fetch_game_players, fetch_game_events)
+    metrics = get_metrics()
+    profiler = get_profiler()
+    complete = True
+
+    def fail(guid, stage, e):
+        # The region watermarks must not move past a game that wasn't written
+        nonlocal complete
+        complete = False
+        print(f"Error processing GUID {guid}: {e}")
+        metrics.error(stage, e)
+        metrics.log("game_failed", guid=guid, stage=stage, error_class=type(e).__name__, error=str(e))
+        dead = ledger.mark_failed(guid, e) == DEAD
+        metrics.inc("games_total", outcome="dead" if dead else "failed")
+        if dead:
+            print(f"Giving up on GUID {guid}, see `python3 src/ledger.py dead`")
+
+    for guid in guids:
+        if stopping is not None and stopping.is_set():
+            return False
+        stage = "fetch"
+        try:
+            game_details, game_players, raw_events = load_game(guid, fetchers, cache)
+            game = game_details, game_players, raw_events
+            stage = "parse"
+            with metrics.timer("parse_seconds"), profiler.capture(guid, "parse", game):
+                game_events = parse_events(raw_events)
+            metrics.inc("parse_events_total", len(raw_events))
+
+            stage = "write"
+            with profiler.capture(guid, "write", game):
+                writer.write(game_players, game_events, game_details, lambda guid=guid: ledger.mark_done(guid), raw_events,
+                             lambda e, guid=guid: fail(guid, "write", e))
+        except Exception as e:
+            fail(guid, stage, e)
+            continue
+    return complete
+
+def persist_region_states(ledger, region_states):
+    for state in region_states:
+        ledger.set_region_state(*state)
 
 if __name__ == "__main__":
         load_dotenv()
@@ -85,20 +150,16 @@ if __name__ == "__main__":
             "port": os.getenv("DB_PORT")
         }
 
-        guids = get_todays_played_game_guids()
-        for guid in guids:
-            try:
-                game_details = fetch_game_details(guid)
-                game_players = fetch_game_players(guid)
-                game_events = parse_events(fetch_game_events(guid))
-
-                write_to_postgres(game_players, game_events, game_details, db_config)
-
-                with open("./src/played_games.txt", "a") as f:
-                    f.write(guid + "\n")
-            except Exception as e:
-                print(f"Error processing GUID {guid}: {e}")
-                with open("./src/error_games.txt", "a") as error_file:
-                    error_file.write(guid + "\n")
-                continue
-            
\ No newline at end of file
+        cache = get_cache()
+        ledger = get_ledger()
+
+        guids, region_states, _ = get_todays_played_game_guids(ledger)
+        writer = PostgresWriter(db_config, pool_size=1)
+        complete = process_games(guids, writer, ledger, cache)
+        writer.close()
+
+        # Only move the watermarks once every game of this poll is written,
+        # otherwise an unchanged listing would hide the failed games next time
+        if complete:
+            persist_region_states(ledger, region_states)
+        get_metrics().set("ingest_last_poll_timestamp_seconds", time.time())
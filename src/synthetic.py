@@ -0,0 +1,172 @@
+import datetime
+import random
+import uuid
+
+from parse import CONFIRMED, FOUL, REGULAR_PERIODS, SCORE, SUBSTITUTION, period_minutes
+
+# GebStatus of an event that was entered but not confirmed; parse_events skips these
+UNCONFIRMED = 20
+
+FIRST_NAMES = ("Arne", "Bram", "Cas", "Daan", "Elias", "Finn", "Jonas", "Lars", "Lucas", "Milan",
+               "Noah", "Robbe", "Seppe", "Thibo", "Vic", "Warre", "Wout", "Xander")
+LAST_NAMES = ("Claes", "De Smet", "Goossens", "Jacobs", "Janssens", "Maes", "Martens", "Mertens",
+              "Peeters", "Verbeke", "Wouters", "Willems")
+TOWNS = ("Aalst", "Brugge", "Gent", "Hasselt", "Kortrijk", "Leuven", "Lier", "Mechelen", "Ninove",
+         "Oostende", "Roeselare", "Tienen")
+
+
+def _guid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128))).upper()
+
+
+def generate_roster(rng, size=10):
+    """
+    DwfDeelByWedGuid entries of one team: RelGUID, Naam, RugNr and GebDat.
+    """
+    shirts = rng.sample(range(4, 100), size)
+    roster = []
+    for shirt in shirts:
+        birthdate = datetime.date(rng.randint(1975, 2008), rng.randint(1, 12), rng.randint(1, 28))
+        roster.append({
+            "RelGUID": _guid(rng),
+            "Naam": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "RugNr": shirt,
+            "GebDat": f"{birthdate:%d-%m-%Y} 00:00:00",
+        })
+    return roster
+
+
+def generate_events(rng, home_roster, away_roster, events_per_period=35, overtime_rate=0.05,
+                    unconfirmed_rate=0.01):
+    """
+    GebNis events of one game in the order the VBL app records them: the players on court
+    checked in at the start of every period, then scores ("2 (45-40)"), fouls followed by
+    free throws, and substitutions ("uit" then "in" at the same minute). A tied game, or
+    `overtime_rate` of the games, goes to overtime periods of parse.OVERTIME_MINUTES.
+    """
+    rosters = {"T": home_roster, "U": away_roster}
+    on_court = {side: rng.sample(roster, 5) for side, roster in rosters.items()}
+    score = {"T": 0, "U": 0}
+    events = []
+
+    def event(period, side, player, event_type, text, minute, status=CONFIRMED):
+        events.append({
+            "Periode": period, "TofU": side, "RugNr": player["RugNr"], "GebType": event_type,
+            "GebStatus": status, "Text": text, "Minuut": minute, "RelGUID": player["RelGUID"],
+        })
+
+    def scored(period, side, player, points, minute):
+        score[side] += points
+        event(period, side, player, SCORE, f"{points} ({score['T']}-{score['U']})", minute)
+
+    period = 0
+    forced_overtime = rng.random() < overtime_rate
+    while period < REGULAR_PERIODS or score["T"] == score["U"] or (forced_overtime and period == REGULAR_PERIODS):
+        period += 1
+        minutes = period_minutes(period)
+        for side in "TU":
+            for player in sorted(on_court[side], key=lambda player: player["RugNr"]):
+                event(period, side, player, SUBSTITUTION, "in", 0)
+
+        count = events_per_period if period <= REGULAR_PERIODS else events_per_period // 2
+        for minute in sorted(rng.randrange(minutes) for _ in range(count)):
+            side = rng.choice("TU")
+            player = rng.choice(on_court[side])
+            roll = rng.random()
+            if roll < unconfirmed_rate:
+                event(period, side, player, SCORE, f"2 ({score['T']}-{score['U']})", minute, UNCONFIRMED)
+            elif roll < 0.45:
+                scored(period, side, player, rng.choice((2, 2, 2, 3)), minute)
+            elif roll < 0.7:
+                event(period, side, player, FOUL, "", minute)
+                # A shooting foul gives the other team one or two free throws
+                if rng.random() < 0.4:
+                    other = "U" if side == "T" else "T"
+                    shooter = rng.choice(on_court[other])
+                    for _ in range(rng.choice((1, 2, 2))):
+                        if rng.random() < 0.7:
+                            scored(period, other, shooter, 1, minute)
+            else:
+                bench = [substitute for substitute in rosters[side] if substitute not in on_court[side]]
+                if not bench:
+                    continue
+                substitute = rng.choice(bench)
+                event(period, side, player, SUBSTITUTION, "uit", minute)
+                event(period, side, substitute, SUBSTITUTION, "in", minute)
+                on_court[side][on_court[side].index(player)] = substitute
+
+        if period > 12 and score["T"] == score["U"]:
+            # Settle an unlikely run of tied overtimes
+            scored(period, "T", on_court["T"][0], 1, minutes - 1)
+
+    return events, score
+
+
+def _round_robin(teams):
+    """
+    Rounds of (home, away) pairs in which every team meets every other team once.
+    """
+    teams = list(teams)
+    if len(teams) % 2:
+        teams.append(None)
+    rounds = []
+    for round_number in range(len(teams) - 1):
+        pairs = []
+        for i in range(len(teams) // 2):
+            home, away = teams[i], teams[-1 - i]
+            if home is not None and away is not None:
+                pairs.append((home, away) if round_number % 2 else (away, home))
+        rounds.append(pairs)
+        teams.insert(1, teams.pop())
+    return rounds
+
+
+def generate_games(count, seed=0, teams_per_poule=10, roster_size=10, events_per_period=35,
+                   overtime_rate=0.05, unconfirmed_rate=0.01, season_start=datetime.date(2024, 9, 14)):
+    """
+    Yield `count` finished games as (game_details, game_players, raw_events), the shapes
+    returned by fetch_game_details, fetch_game_players and fetch_game_events.
+
+    Games come from round-robin poules of `teams_per_poule` teams with fixed rosters, played
+    weekly from `season_start` with every poule playing a round each week, so players and
+    teams recur like in a real season. The same seed and count always give the same games.
+    """
+    rng = random.Random(seed)
+    games_per_poule = teams_per_poule * (teams_per_poule - 1)
+    poules = []
+    for poule_number in range(1, -(-count // games_per_poule) + 1):
+        teams = [{
+            "guid": _guid(rng),
+            "name": f"{rng.choice(TOWNS)} BC {poule_number}{chr(65 + i)}",
+            "roster": generate_roster(rng, roster_size),
+        } for i in range(teams_per_poule)]
+        rounds = _round_robin(teams)
+        # Return games with home and away swapped
+        rounds += [[(away, home) for home, away in pairs] for pairs in rounds]
+        poules.append((_guid(rng), f"Poule {poule_number}", rounds))
+
+    played = 0
+    for week in range(len(poules[0][2]) if poules else 0):
+        date = season_start + datetime.timedelta(weeks=week)
+        for poule_guid, poule_name, rounds in poules:
+            for home, away in rounds[week]:
+                if played == count:
+                    return
+                events, score = generate_events(rng, home["roster"], away["roster"], events_per_period,
+                                                overtime_rate, unconfirmed_rate)
+                details = {
+                    "guid": _guid(rng),
+                    "teamThuisGUID": home["guid"],
+                    "teamThuisNaam": home["name"],
+                    "teamUitGUID": away["guid"],
+                    "teamUitNaam": away["name"],
+                    "datumString": f"{date:%d-%m-%Y}",
+                    "beginTijd": rng.choice(("14.00", "16.00", "18.30", "20.00", "20.30")),
+                    "pouleGUID": poule_guid,
+                    "pouleNaam": poule_name,
+                    "gespeeld": "1",
+                    "uitslag": f"{score['T']} - {score['U']}",
+                }
+                players = {"TtDeel": home["roster"], "TuDeel": away["roster"]}
+                played += 1
+                yield details, players, events
@@ -0,0 +1,209 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from json_stream import iter_json_array
+from metrics import get_metrics
+
+BASE_URL = "https://vblcb.wisseq.eu/VBLCB_WebService/data"
+AUTH_HEADER = "Basic YmFza2V0amFhbkBnbWFpbC5jb206YmFza2V0MjM6QjA5QjBFNDAtMTE2OC00RD8hCLUIzQ0QtOTI8MUVDMzdCMjg3"
+
+# (connect, read) timeouts in seconds per endpoint
+TIMEOUTS = {
+    "MatchByWedGuid": (5, 15),
+    "DwfDeelByWedGuid": (5, 15),
+    "DwfVgngByWedGuid": (5, 30),
+    "MatchesByRegioPeriode": (5, 60),
+}
+DEFAULT_TIMEOUT = (5, 30)
+
+# Bytes read at a time when streaming a response body
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by all threads using a client.
+    """
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a token is available and take it.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def try_acquire(self):
+        """
+        Take a token if one is available, without blocking.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class VblClient:
+    """
+    Client for the VBL web service holding one pooled keep-alive session.
+    """
+    def __init__(self, base_url=BASE_URL, requests_per_second=10.0, burst=20, max_retries=3,
+                 backoff=0.5, pool_size=16):
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.limiter = TokenBucket(requests_per_second, burst)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": AUTH_HEADER,
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+
+    def _request(self, method, endpoint, **kwargs):
+        """
+        Send a request, retrying with exponential backoff on 5xx responses, timeouts and connection errors.
+        A 429 is retried after its Retry-After seconds.
+        """
+        url = f"{self.base_url}/{endpoint}"
+        timeout = TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+        metrics = get_metrics()
+
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            delay = self.backoff * 2 ** attempt
+            try:
+                with metrics.timer("vbl_request_seconds", endpoint=endpoint):
+                    response = self.session.request(method, url, timeout=timeout, **kwargs)
+                    if not kwargs.get("stream"):
+                        # Read the body here so its download counts towards the latency
+                        metrics.inc("vbl_response_bytes_total", len(response.content), endpoint=endpoint)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                metrics.inc("vbl_requests_total", endpoint=endpoint, status=type(e).__name__)
+                if attempt == self.max_retries:
+                    raise
+            else:
+                metrics.inc("vbl_requests_total", endpoint=endpoint, status=response.status_code)
+                throttled = response.status_code == 429
+                if (response.status_code < 500 and not throttled) or attempt == self.max_retries:
+                    response.raise_for_status()
+                    return response
+                if throttled and response.headers.get("Retry-After", "").isdigit():
+                    delay = max(delay, int(response.headers["Retry-After"]))
+                response.close()
+            time.sleep(delay)
+
+    def _put(self, endpoint, guid):
+        req_body = {
+            "AuthHeader": AUTH_HEADER,
+            "WQVer": "v.5b",
+            "CRUD": "R",
+            "RelNr": "v.5b",
+            "WedGUID": guid
+        }
+        headers = {"Content-Type": "application/json; charset=UTF-8"}
+        return self._request("PUT", endpoint, headers=headers, json=req_body)
+
+    def fetch_game_details(self, guid):
+        response = self._request("GET", "MatchByWedGuid", params={"issguid": guid})
+        return response.json()[0]["doc"]
+
+    def fetch_game_players(self, guid):
+        return self._put("DwfDeelByWedGuid", guid).json()
+
+    def fetch_game_events(self, guid):
+        return self._put("DwfVgngByWedGuid", guid).json()["GebNis"]
+
+    def fetch_region_listing(self, region, dt_start, dt_end, etag=None, stream=False):
+        """
+        Return the raw MatchesByRegioPeriode response, or None when the server
+        answers 304 to the `etag` of the previous poll. With `stream` the body is
+        left unread, to be consumed with iter_region_matches.
+        """
+        params = {"curRegio": region, "dtStart": dt_start, "dtEnd": dt_end}
+        headers = {"If-None-Match": etag} if etag else {}
+        response = self._request("GET", "MatchesByRegioPeriode", params=params, headers=headers, stream=stream)
+        if response.status_code == 304:
+            return None
+        return response
+
+
+def iter_region_matches(response, fields=("guid", "uitslag"), digest=None):
+    """
+    Decode a streamed MatchesByRegioPeriode response one match at a time, yielding
+    only `fields` of each match. `digest` (a hashlib object) is fed the raw body.
+    """
+    metrics = get_metrics()
+
+    def chunks():
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            if digest is not None:
+                digest.update(chunk)
+            metrics.inc("vbl_response_bytes_total", len(chunk), endpoint="MatchesByRegioPeriode")
+            yield chunk
+
+    try:
+        for match in iter_json_array(chunks()):
+            yield {field: match.get(field) for field in fields}
+    finally:
+        response.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> VblClient:
+    """
+    Return the process-wide client, creating it on first use.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = VblClient(
+                base_url=os.getenv("VBL_BASE_URL", BASE_URL).rstrip("/"),
+                requests_per_second=float(os.getenv("VBL_REQUESTS_PER_SECOND", "10")),
+                burst=int(os.getenv("VBL_BURST", "20")),
+            )
+        return _client
+
+
+def fetch_game_details(guid):
+    return get_client().fetch_game_details(guid)
+
+
+def fetch_game_players(guid):
+    return get_client().fetch_game_players(guid)
+
+
+def fetch_game_events(guid):
+    return get_client().fetch_game_events(guid)
+
+
+def fetch_region_listing(region, dt_start, dt_end, etag=None, stream=False):
+    return get_client().fetch_region_listing(region, dt_start, dt_end, etag, stream)
@@ -1,130 +1,295 @@
-from datetime import datetime
+from datetime import date, datetime
+import re
+import threading
+import time
+import io
+import json
+import random
 import psycopg2
+import psycopg2.errors
+from psycopg2.pool import ThreadedConnectionPool
 from psycopg2.extras import execute_values
-from dotenv import load_dotenv
 
-def update_player_averages(cursor, player_guid):
+from metrics import get_metrics
+from migrations import create_season_partitions, migrate_postgres
+
+SCORE_PATTERN = re.compile(r"^(\d+)-(\d+)$")
+
+# Channel notified with the keys a committed game touched, see query_service.py
+GAME_WRITTEN_CHANNEL = "game_written"
+
+# Times a game that lost a deadlock is retried, after committing the rest of its batch
+DEADLOCK_RETRIES = 3
+
+def add_player_games(cursor, player_game_rows):
+    """
+    Insert PlayerGames rows and fold the ones that were actually inserted into the running
+    sums of their players, all in one statement.
+
+    The sums are updated relative to the current row (sum = sum + new), so concurrent writers
+    can't lose each other's updates, and averages are derived from the exact sums. The Players
+    rows are locked in player_guid order, so writers sharing players queue instead of deadlocking.
+    """
+    execute_values(cursor, """
+        WITH inserted AS (
+            INSERT INTO PlayerGames (
+                player_guid, game_guid, team_guid, total_points, one_pointers,
+                two_pointers, three_pointers, fouls, total_minutes, plus_minus, season
+            ) VALUES %s
+            ON CONFLICT DO NOTHING
+            RETURNING player_guid, total_points, one_pointers, two_pointers, three_pointers,
+                fouls, total_minutes, plus_minus
+        ),
+        locked AS (
+            SELECT player_guid FROM Players
+            WHERE player_guid IN (SELECT player_guid FROM inserted)
+            ORDER BY player_guid
+            FOR NO KEY UPDATE
+        )
+        UPDATE Players p
+        SET
+            total_games = p.total_games + 1,
+            sum_points = p.sum_points + i.total_points,
+            sum_one_pointers = p.sum_one_pointers + i.one_pointers,
+            sum_two_pointers = p.sum_two_pointers + i.two_pointers,
+            sum_three_pointers = p.sum_three_pointers + i.three_pointers,
+            sum_fouls = p.sum_fouls + i.fouls,
+            sum_minutes = p.sum_minutes + i.total_minutes,
+            sum_plus_minus = p.sum_plus_minus + i.plus_minus,
+            avg_points = (p.sum_points + i.total_points)::REAL / (p.total_games + 1),
+            avg_one_pointers = (p.sum_one_pointers + i.one_pointers)::REAL / (p.total_games + 1),
+            avg_two_pointers = (p.sum_two_pointers + i.two_pointers)::REAL / (p.total_games + 1),
+            avg_three_pointers = (p.sum_three_pointers + i.three_pointers)::REAL / (p.total_games + 1),
+            avg_fouls = (p.sum_fouls + i.fouls)::REAL / (p.total_games + 1),
+            avg_minutes = (p.sum_minutes + i.total_minutes)::REAL / (p.total_games + 1),
+            avg_plus_minus = (p.sum_plus_minus + i.plus_minus)::REAL / (p.total_games + 1)
+        FROM inserted i
+        JOIN locked l ON l.player_guid = i.player_guid
+        WHERE p.player_guid = i.player_guid
+    """, sorted(player_game_rows), page_size=len(player_game_rows))
+
+def rebuild_player_aggregates(cursor):
     """
-    Recalculate and update averages for a specific player based on all their games.
+    Recompute every player's games, sums and averages from PlayerGames in one pass.
     """
     cursor.execute("""
-        SELECT 
-            AVG(total_points) as avg_points,
-            AVG(one_pointers) as avg_one_pointers,
-            AVG(two_pointers) as avg_two_pointers,
-            AVG(three_pointers) as avg_three_pointers,
-            AVG(fouls) as avg_fouls,
-            AVG(total_minutes) as avg_minutes,
-            AVG(plus_minus) as avg_plus_minus
-        FROM PlayerGames
-        WHERE player_guid = %s
-    """, (player_guid,))
-    
-    averages = cursor.fetchone()
-    
+        UPDATE Players p
+        SET
+            total_games = a.games,
+            sum_points = a.sum_points,
+            sum_one_pointers = a.sum_one_pointers,
+            sum_two_pointers = a.sum_two_pointers,
+            sum_three_pointers = a.sum_three_pointers,
+            sum_fouls = a.sum_fouls,
+            sum_minutes = a.sum_minutes,
+            sum_plus_minus = a.sum_plus_minus,
+            avg_points = a.sum_points::REAL / a.games,
+            avg_one_pointers = a.sum_one_pointers::REAL / a.games,
+            avg_two_pointers = a.sum_two_pointers::REAL / a.games,
+            avg_three_pointers = a.sum_three_pointers::REAL / a.games,
+            avg_fouls = a.sum_fouls::REAL / a.games,
+            avg_minutes = a.sum_minutes::REAL / a.games,
+            avg_plus_minus = a.sum_plus_minus::REAL / a.games
+        FROM (
+            SELECT
+                player_guid,
+                COUNT(*) AS games,
+                SUM(total_points) AS sum_points,
+                SUM(one_pointers) AS sum_one_pointers,
+                SUM(two_pointers) AS sum_two_pointers,
+                SUM(three_pointers) AS sum_three_pointers,
+                SUM(fouls) AS sum_fouls,
+                SUM(total_minutes) AS sum_minutes,
+                SUM(plus_minus) AS sum_plus_minus
+            FROM PlayerGames
+            GROUP BY player_guid
+        ) a
+        WHERE p.player_guid = a.player_guid
+    """)
+
+def update_standings(cursor, game_events, date_object):
+    """
+    Add a newly inserted game to the Standings of both teams.
+
+    Streaks assume games arrive in date order; after an out-of-order backfill run
+    rebuild_standings to recompute them.
+    """
+    score_match = SCORE_PATTERN.match(game_events.uitslag.replace(" ", ""))
+    if not score_match:
+        return
+    home_points, away_points = int(score_match.group(1)), int(score_match.group(2))
+
+    # Sorted on team so concurrent writers lock the two Standings rows in the same order
+    rows = sorted([
+        (game_events.pouleGUID, game_events.teamThuisGUID, game_events.pouleNaam, game_events.teamThuisNaam,
+         int(home_points > away_points), int(home_points < away_points), home_points, away_points, date_object),
+        (game_events.pouleGUID, game_events.teamUitGUID, game_events.pouleNaam, game_events.teamUitNaam,
+         int(away_points > home_points), int(away_points < home_points), away_points, home_points, date_object),
+    ], key=lambda row: (row[0], row[1]))
+    execute_values(cursor, """
+        INSERT INTO Standings (
+            poule_guid, team_guid, poule_name, team_name, won, lost, points_for, points_against, last_game_date,
+            played, differential, streak
+        )
+        SELECT
+            v.poule_guid, v.team_guid, v.poule_name, v.team_name, v.won, v.lost, v.points_for, v.points_against,
+            v.last_game_date::DATE, 1, v.points_for - v.points_against, v.won - v.lost
+        FROM (VALUES %s) AS v (
+            poule_guid, team_guid, poule_name, team_name, won, lost, points_for, points_against, last_game_date
+        )
+        ORDER BY v.poule_guid, v.team_guid
+        ON CONFLICT (poule_guid, team_guid) DO UPDATE SET
+            played = Standings.played + 1,
+            won = Standings.won + excluded.won,
+            lost = Standings.lost + excluded.lost,
+            points_for = Standings.points_for + excluded.points_for,
+            points_against = Standings.points_against + excluded.points_against,
+            differential = Standings.differential + excluded.differential,
+            streak = CASE
+                WHEN excluded.won = 1 THEN GREATEST(Standings.streak, 0) + 1
+                WHEN excluded.lost = 1 THEN LEAST(Standings.streak, 0) - 1
+                ELSE 0
+            END,
+            last_game_date = GREATEST(Standings.last_game_date, excluded.last_game_date)
+    """, rows)
+
+def rebuild_standings(cursor):
+    """
+    Recompute Standings from Games in one set-based pass.
+    """
+    cursor.execute("DELETE FROM Standings")
     cursor.execute("""
-        UPDATE Players
-        SET 
-            avg_points = %s,
-            avg_one_pointers = %s,
-            avg_two_pointers = %s,
-            avg_three_pointers = %s,
-            avg_fouls = %s,
-            avg_minutes = %s,
-            avg_plus_minus = %s
-        WHERE player_guid = %s
-    """, (
-        averages[0] or 0,  # avg_points
-        averages[1] or 0,  # avg_one_pointers
-        averages[2] or 0,  # avg_two_pointers
-        averages[3] or 0,  # avg_three_pointers
-        averages[4] or 0,  # avg_fouls
-        averages[5] or 0,  # avg_minutes
-        averages[6] or 0,  # avg_plus_minus
-        player_guid
-    ))
+        WITH results AS (
+            SELECT poule_guid, poule_name, home_team_guid AS team_guid, home_team_name AS team_name,
+                game_guid, date, start_time,
+                split_part(score, '-', 1)::INTEGER AS points_for,
+                split_part(score, '-', 2)::INTEGER AS points_against
+            FROM Games
+            WHERE score ~ '^[0-9]+-[0-9]+$'
+            UNION ALL
+            SELECT poule_guid, poule_name, away_team_guid, away_team_name,
+                game_guid, date, start_time,
+                split_part(score, '-', 2)::INTEGER,
+                split_part(score, '-', 1)::INTEGER
+            FROM Games
+            WHERE score ~ '^[0-9]+-[0-9]+$'
+        ),
+        ordered AS (
+            SELECT *,
+                SIGN(points_for - points_against) AS outcome,
+                ROW_NUMBER() OVER (
+                    PARTITION BY poule_guid, team_guid
+                    ORDER BY date DESC NULLS LAST, start_time DESC, game_guid DESC
+                ) AS recency
+            FROM results
+        ),
+        latest AS (
+            SELECT poule_guid, team_guid, outcome AS last_outcome
+            FROM ordered
+            WHERE recency = 1
+        )
+        INSERT INTO Standings (
+            poule_guid, team_guid, poule_name, team_name, played, won, lost,
+            points_for, points_against, differential, streak, last_game_date
+        )
+        SELECT
+            o.poule_guid,
+            o.team_guid,
+            MAX(o.poule_name),
+            MAX(o.team_name),
+            COUNT(*),
+            COUNT(*) FILTER (WHERE o.outcome > 0),
+            COUNT(*) FILTER (WHERE o.outcome < 0),
+            SUM(o.points_for),
+            SUM(o.points_against),
+            SUM(o.points_for - o.points_against),
+            -- Length of the most recent run of equal results, signed by its outcome
+            l.last_outcome * (COALESCE(MIN(o.recency) FILTER (WHERE o.outcome <> l.last_outcome), COUNT(*) + 1) - 1),
+            MAX(o.date)
+        FROM ordered o
+        JOIN latest l ON l.poule_guid = o.poule_guid AND l.team_guid = o.team_guid
+        GROUP BY o.poule_guid, o.team_guid, l.last_outcome
+    """)
 
 def initialize_database(db_config: dict):
     """
-    Initialize the PostgreSQL database by creating necessary tables if they do not exist.
+    Bring the PostgreSQL database up to the latest schema version (see migrations.py).
     """
     conn = psycopg2.connect(**db_config)
-    cursor = conn.cursor()
+    try:
+        migrate_postgres(conn)
+    finally:
+        conn.close()
 
-    # Create tables
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS Games (
-            game_guid TEXT PRIMARY KEY,
-            home_team_guid TEXT NOT NULL,
-            home_team_name TEXT NOT NULL,
-            away_team_guid TEXT NOT NULL,
-            away_team_name TEXT NOT NULL,
-            date DATE,
-            poule_guid TEXT NOT NULL,
-            poule_name TEXT NOT NULL,
-            played TEXT NOT NULL,
-            score TEXT NOT NULL,
-            start_time TEXT NOT NULL
-        );
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS Players (
-            player_guid TEXT PRIMARY KEY,
-            name TEXT,
-            birthdate DATE,
-            total_games INTEGER DEFAULT 0,
-            avg_points REAL DEFAULT 0,
-            avg_one_pointers REAL DEFAULT 0,
-            avg_two_pointers REAL DEFAULT 0,
-            avg_three_pointers REAL DEFAULT 0,
-            avg_fouls REAL DEFAULT 0,
-            avg_minutes REAL DEFAULT 0,
-            avg_plus_minus REAL DEFAULT 0
-        );
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS PlayerGames (
-            player_guid TEXT NOT NULL,
-            game_guid TEXT NOT NULL,
-            team_guid TEXT NOT NULL,
-            total_points INTEGER DEFAULT 0,
-            one_pointers INTEGER DEFAULT 0,
-            two_pointers INTEGER DEFAULT 0,
-            three_pointers INTEGER DEFAULT 0,
-            fouls INTEGER DEFAULT 0,
-            total_minutes INTEGER DEFAULT 0,
-            plus_minus INTEGER DEFAULT 0,
-            PRIMARY KEY (player_guid, game_guid),
-            FOREIGN KEY (player_guid) REFERENCES Players(player_guid),
-            FOREIGN KEY (game_guid) REFERENCES Games(game_guid)
-        );
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS Quarters (
-            game_guid TEXT NOT NULL,
-            team_guid TEXT NOT NULL,
-            quarter INTEGER NOT NULL,
-            total_points INTEGER DEFAULT 0,
-            one_pointers INTEGER DEFAULT 0,
-            two_pointers INTEGER DEFAULT 0,
-            three_pointers INTEGER DEFAULT 0,
-            fouls INTEGER DEFAULT 0,
-            PRIMARY KEY (game_guid, team_guid, quarter),
-            FOREIGN KEY (game_guid) REFERENCES Games(game_guid)
-        );
-    """)
-    conn.commit()
-    conn.close()
 
+def game_date(date_string):
+    """
+    Date of a datumString ("dd-mm-yyyy"), or None.
+    """
+    try:
+        return datetime.strptime(date_string, "%d-%m-%Y").date()
+    except ValueError:
+        return None
 
-def write_to_postgres(game_players, game_events, game_details, db_config):
+
+def season_of(date_object):
     """
-    Write data to the PostgreSQL database.
+    Year a season started in, or 0 when the date is unknown; seasons run from July to June.
     """
-    initialize_database(db_config)
-    conn = psycopg2.connect(**db_config)
-    cursor = conn.cursor()
+    if date_object is None:
+        return 0
+    return date_object.year if date_object.month >= 7 else date_object.year - 1
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
 
+
+def copy_rows(cursor, table, columns, rows):
+    """
+    Bulk load `rows` into `table` with COPY FROM STDIN.
+    """
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(map(_copy_value, row)))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+
+def write_raw_game(cursor, game_guid, season, game_players, raw_events):
+    """
+    Replace the raw events and roster of a game.
+    """
+    cursor.execute("DELETE FROM Events WHERE game_guid = %s", (game_guid,))
+    copy_rows(cursor, "Events", (
+        "season", "game_guid", "sequence", "period", "minute", "event_type", "status",
+        "team", "shirt", "player_guid", "text",
+    ), (
+        (
+            season, game_guid, sequence, event.get("Periode"), event.get("Minuut"), event.get("GebType"),
+            event.get("GebStatus"), event.get("TofU"), event.get("RugNr"), event.get("RelGUID"), event.get("Text"),
+        )
+        for sequence, event in enumerate(raw_events)
+    ))
+
+    cursor.execute("DELETE FROM Rosters WHERE game_guid = %s", (game_guid,))
+    copy_rows(cursor, "Rosters", ("game_guid", "team", "player_guid", "data"), (
+        (game_guid, team, player.get("RelGUID"), json.dumps(player))
+        for team, key in (("T", "TtDeel"), ("U", "TuDeel"))
+        for player in game_players.get(key, [])
+    ))
+
+
+def write_game(cursor, game_players, game_events, game_details, raw_events=None):
+    """
+    Insert one game with its players on the given cursor, without committing.
+    With `raw_events` the raw events and roster are stored as well. The partitions of the
+    game's season must exist already (create_season_partitions), otherwise its rows go to
+    the default partitions.
+    """
     # Extracting game details
     game_events.teamThuisGUID = game_details.get("teamThuisGUID", "")
     game_events.teamThuisNaam = game_details.get("teamThuisNaam", "")
@@ -138,18 +303,18 @@ def write_to_postgres(game_players, game_events, game_details, db_config):
     game_events.beginTijd = game_details.get("beginTijd", "")
     game_events.guid = game_details.get("guid", "")
 
-    try:
-        try:
-            date_object = datetime.strptime(game_events.datumString, "%d-%m-%Y").date()
-        except ValueError:
-            date_object = None
+    date_object = game_date(game_events.datumString)
+    season = season_of(date_object)
+    metrics = get_metrics()
 
-        # Insert game data
+    # Insert game data
+    with metrics.timer("db_statement_seconds", writer="postgres", group="games"):
         cursor.execute("""
             INSERT INTO Games (
-                game_guid, home_team_guid, home_team_name, away_team_guid, away_team_name, date, poule_guid, poule_name, played, score, start_time
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (game_guid) DO NOTHING;
+                game_guid, home_team_guid, home_team_name, away_team_guid, away_team_name, date, poule_guid, poule_name, played, score, start_time, season
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT DO NOTHING
+            RETURNING game_guid;
         """, (
             game_events.guid,
             game_events.teamThuisGUID,
@@ -162,61 +327,140 @@ def write_to_postgres(game_players, game_events, game_details, db_config):
             game_events.gespeeld,
             game_events.uitslag.replace(" ", ""),
             game_events.beginTijd.replace(".", ":"),
+            season,
         ))
+        inserted = cursor.fetchone() is not None
+        if inserted:
+            update_standings(cursor, game_events, date_object)
+    if inserted:
+        metrics.inc("db_rows_total", writer="postgres", group="games")
 
-        # Process player details
-        detail_lookup = {detail["RelGUID"]: detail for detail in game_players["TtDeel"] + game_players["TuDeel"]}
-        cursor.execute("SELECT player_guid, total_games FROM Players")
-        existing_players = {row[0]: row[1] for row in cursor.fetchall()}
+    # Quarter statistics for both teams were accumulated while parsing
+    quarter_rows = [(game_events.guid,) + row for row in game_events.quarter_rows()]
+    with metrics.timer("db_statement_seconds", writer="postgres", group="quarters"):
+        execute_values(cursor, """
+            INSERT INTO Quarters (
+                game_guid, team_guid, quarter, total_points, one_pointers,
+                two_pointers, three_pointers, fouls
+            ) VALUES %s
+            ON CONFLICT (game_guid, team_guid, quarter) DO NOTHING;
+        """, quarter_rows)
+    metrics.inc("db_rows_total", len(quarter_rows), writer="postgres", group="quarters")
 
-        players_to_update = set()
+    # Lineup stints
+    stint_rows = game_events.stint_rows()
+    if stint_rows:
+        with metrics.timer("db_statement_seconds", writer="postgres", group="stints"):
+            execute_values(cursor, """
+                INSERT INTO Stints (
+                    game_guid, team_guid, stint, quarter, start_minute, end_minute,
+                    lineup, player_guids, points_for, points_against
+                ) VALUES %s
+                ON CONFLICT (game_guid, team_guid, stint) DO NOTHING;
+            """, [(game_events.guid,) + row for row in stint_rows])
+        metrics.inc("db_rows_total", len(stint_rows), writer="postgres", group="stints")
 
-        for team_name, team_stats in {"homeTeam": game_events.homeTeam, "awayTeam": game_events.awayTeam}.items():
-            team_guid = game_events.teamThuisGUID if team_name == "homeTeam" else game_events.teamUitGUID
-            for player_id, player_stats in team_stats.players.items():
-                player_guid = player_stats.RelGUID
-                player_name = detail_lookup.get(player_guid, {}).get("Naam", "Unknown")
+    # Process player details
+    detail_lookup = {detail["RelGUID"]: detail for detail in game_players["TtDeel"] + game_players["TuDeel"]}
 
-                birthdate_string = detail_lookup.get(player_guid, {}).get("GebDat", None)
-                try:
-                    player_birthdate = datetime.strptime(birthdate_string.split(" ")[0], "%d-%m-%Y").date() if birthdate_string else None
-                except ValueError:
-                    player_birthdate = None
-
-                # Add player to update set
-                players_to_update.add(player_guid)
-                
-                if player_guid in existing_players:
-                    total_games = existing_players[player_guid] + 1
-                    cursor.execute("""
-                        UPDATE Players
-                        SET total_games = %s
-                        WHERE player_guid = %s;
-                    """, (total_games, player_guid))
-                else:
-                    cursor.execute("""
-                        INSERT INTO Players (
-                            player_guid, name, birthdate, total_games
-                        ) VALUES (%s, %s, %s, %s)
-                        ON CONFLICT (player_guid) DO NOTHING;
-                    """, (player_guid, player_name, player_birthdate, 1))
-
-                cursor.execute("""
-                    INSERT INTO PlayerGames (
-                        player_guid, game_guid, team_guid, total_points, one_pointers,
-                        two_pointers, three_pointers, fouls, total_minutes, plus_minus
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (player_guid, game_guid) DO NOTHING;
-                """, (
-                    player_guid, game_events.guid, team_guid,
-                    player_stats.totalPoints, player_stats.onePointers, player_stats.twoPointers,
-                    player_stats.threePointers, player_stats.fouls, player_stats.totalMinutesPlayed,
-                    player_stats.plusMinus
-                ))
-
-        for player_guid in players_to_update:
-            update_player_averages(cursor, player_guid)
+    player_rows = []
+    player_game_rows = []
+
+    for team_name, team_stats in {"homeTeam": game_events.homeTeam, "awayTeam": game_events.awayTeam}.items():
+        team_guid = game_events.teamThuisGUID if team_name == "homeTeam" else game_events.teamUitGUID
+        for player_id, player_stats in team_stats.players.items():
+            player_guid = player_stats.RelGUID
+            player_name = detail_lookup.get(player_guid, {}).get("Naam", "Unknown")
+
+            birthdate_string = detail_lookup.get(player_guid, {}).get("GebDat", None)
+            try:
+                player_birthdate = datetime.strptime(birthdate_string.split(" ")[0], "%d-%m-%Y").date() if birthdate_string else None
+            except ValueError:
+                player_birthdate = None
+
+            player_rows.append((player_guid, player_name, player_birthdate, 0))
+            player_game_rows.append((
+                player_guid, game_events.guid, team_guid,
+                player_stats.totalPoints, player_stats.onePointers, player_stats.twoPointers,
+                player_stats.threePointers, player_stats.fouls, player_stats.totalMinutesPlayed,
+                player_stats.plusMinus, season
+            ))
+
+    if player_rows:
+        with metrics.timer("db_statement_seconds", writer="postgres", group="players"):
+            # New players first so the PlayerGames foreign keys resolve, in player_guid order
+            # like every other statement that locks Players rows
+            execute_values(cursor, """
+                INSERT INTO Players (
+                    player_guid, name, birthdate, total_games
+                ) VALUES %s
+                ON CONFLICT (player_guid) DO NOTHING;
+            """, sorted(player_rows))
+
+            # Only rows that were actually inserted are counted, so re-processing a game doesn't count it twice
+            add_player_games(cursor, player_game_rows)
+        metrics.inc("db_rows_total", len(player_rows) + len(player_game_rows), writer="postgres", group="players")
+
+    # The final rows replace the provisional ones written while the game was live
+    cursor.execute("DELETE FROM LivePlayerGames WHERE game_guid = %s", (game_events.guid,))
+
+    if raw_events is not None:
+        with metrics.timer("db_statement_seconds", writer="postgres", group="raw_events"):
+            write_raw_game(cursor, game_events.guid, season, game_players, raw_events)
+        metrics.inc("db_rows_total", len(raw_events), writer="postgres", group="raw_events")
+
+    notify_game_written(
+        cursor, game_events.guid, (game_events.teamThuisGUID, game_events.teamUitGUID),
+        game_events.pouleGUID, [row[0] for row in player_rows],
+    )
+
+
+def notify_game_written(cursor, game_guid=None, team_guids=(), poule_guid=None, player_guids=()):
+    """
+    Tell listeners which game, teams, poule and players a write touched. Postgres delivers
+    the notification when the transaction commits, and drops it if the game's savepoint is
+    rolled back. Without a game GUID it means everything may have changed.
+    """
+    payload = {"all": True} if game_guid is None else {
+        "game": game_guid, "teams": list(team_guids), "poule": poule_guid, "players": list(player_guids),
+    }
+    cursor.execute("SELECT pg_notify(%s, %s)", (GAME_WRITTEN_CHANNEL, json.dumps(payload)))
+
+
+def write_live_player_games(cursor, player_game_rows):
+    """
+    Upsert provisional (player_guid, game_guid, team_guid, points, one/two/three-pointers,
+    fouls, minutes, plus-minus) rows of a game in progress.
+    """
+    execute_values(cursor, """
+        INSERT INTO LivePlayerGames (
+            player_guid, game_guid, team_guid, total_points, one_pointers,
+            two_pointers, three_pointers, fouls, total_minutes, plus_minus
+        ) VALUES %s
+        ON CONFLICT (player_guid, game_guid) DO UPDATE SET
+            team_guid = EXCLUDED.team_guid,
+            total_points = EXCLUDED.total_points,
+            one_pointers = EXCLUDED.one_pointers,
+            two_pointers = EXCLUDED.two_pointers,
+            three_pointers = EXCLUDED.three_pointers,
+            fouls = EXCLUDED.fouls,
+            total_minutes = EXCLUDED.total_minutes,
+            plus_minus = EXCLUDED.plus_minus,
+            updated_at = now();
+    """, player_game_rows)
+
+
+def write_to_postgres(game_players, game_events, game_details, db_config):
+    """
+    Write data to the PostgreSQL database.
+    """
+    initialize_database(db_config)
+    conn = psycopg2.connect(**db_config)
+    cursor = conn.cursor()
 
+    try:
+        create_season_partitions(conn, [season_of(game_date(game_details.get("datumString", "")))])
+        write_game(cursor, game_players, game_events, game_details)
         print(f"Inserted game {game_events.guid} into database.")
 
         conn.commit()
@@ -227,3 +471,188 @@ def write_to_postgres(game_players, game_events, game_details, db_config):
 
     finally:
         conn.close()
+
+
+def _batch_failed(games, error):
+    """
+    Report a batch that was not committed to the `on_failure` callbacks of its games.
+    """
+    if games:
+        print(f"{len(games)} games of a batch were not committed: {error}")
+    for _, on_failure in games:
+        if on_failure is not None:
+            on_failure(error)
+
+
+class PostgresWriter:
+    """
+    Long-lived writer that keeps one pooled connection per thread for the life of the process.
+
+    The schema is checked once when the writer is created. Games are written inside a savepoint
+    so a failing game is rolled back on its own, and every `batch_size` games share a transaction.
+    `on_commit` callbacks passed to `write` run once the game is committed. When a batch can't be
+    committed, the `on_failure` callbacks of its games are called with the error; the game whose
+    write triggered the commit gets the error raised instead.
+
+    Writers lock shared Players and Standings rows in key order within a game, but a batch holds
+    the locks of all its games, so two batches can still deadlock. The game that loses is rolled
+    back to its savepoint, the rest of its batch is committed to release the locks the other
+    writer waits for, and the game is retried.
+
+    Season partitions are created outside the batches: the current and next season's when the
+    writer starts, and an older season's before its first game is written.
+    """
+    def __init__(self, db_config: dict, batch_size=1, pool_size=4):
+        initialize_database(db_config)
+        self.db_config = db_config
+        self.batch_size = batch_size
+        self.pool = ThreadedConnectionPool(1, pool_size, **db_config)
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+        self._seasons = set()
+        self._seasons_lock = threading.Lock()
+        current = season_of(date.today())
+        self._create_seasons([current, current + 1])
+
+    def _create_seasons(self, seasons):
+        """
+        Create the partitions of `seasons` on a connection of their own, once per process.
+        """
+        with self._seasons_lock:
+            missing = [season for season in seasons if season not in self._seasons]
+            if not missing:
+                return
+            conn = psycopg2.connect(**self.db_config)
+            try:
+                for partition in create_season_partitions(conn, missing):
+                    print(f"Created partition {partition}")
+            finally:
+                conn.close()
+            self._seasons.update(missing)
+
+    def _ensure_season(self, session, game_details):
+        season = season_of(game_date(game_details.get("datumString", "")))
+        if not season or season in self._seasons:
+            return
+        # Creating a partition waits for every open transaction on its parent table, this
+        # thread's batch included, so commit that first
+        self._commit(session)
+        self._create_seasons([season])
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is not None and session["conn"].closed:
+            # The server dropped the connection, e.g. a restart while a daemon was idle.
+            # Whatever it had not committed is lost, so its callbacks must not run
+            self.pool.putconn(session["conn"], close=True)
+            lost = session["games"]
+            session.update(conn=self.pool.getconn(), games=[])
+            _batch_failed(lost, psycopg2.InterfaceError("connection lost before the batch was committed"))
+        if session is None:
+            session = {"conn": self.pool.getconn(), "games": []}
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def write(self, game_players, game_events, game_details, on_commit=None, raw_events=None, on_failure=None):
+        session = self._session()
+        self._ensure_season(session, game_details)
+        for attempt in range(DEADLOCK_RETRIES + 1):
+            cursor = session["conn"].cursor()
+            try:
+                cursor.execute("SAVEPOINT game")
+                try:
+                    write_game(cursor, game_players, game_events, game_details, raw_events)
+                except Exception:
+                    cursor.execute("ROLLBACK TO SAVEPOINT game")
+                    raise
+                cursor.execute("RELEASE SAVEPOINT game")
+                break
+            except psycopg2.errors.DeadlockDetected as e:
+                if attempt == DEADLOCK_RETRIES:
+                    print(f"Database error: {e}")
+                    raise
+                print(f"Deadlock writing game {game_details.get('guid')}, retrying")
+                get_metrics().inc("db_deadlocks_total", writer="postgres")
+            except psycopg2.Error as e:
+                print(f"Database error: {e}")
+                raise
+            finally:
+                cursor.close()
+            self._commit(session)
+            time.sleep(random.uniform(0, 0.1 * 2 ** attempt))
+
+        print(f"Inserted game {game_events.guid} into database.")
+        session["games"].append((on_commit, on_failure))
+        if len(session["games"]) >= self.batch_size:
+            self._commit(session, triggered=True)
+
+    def write_live(self, player_game_rows):
+        """
+        Upsert the changed LivePlayerGames rows of a game in progress and commit them right away.
+        """
+        session = self._session()
+        cursor = session["conn"].cursor()
+        try:
+            cursor.execute("SAVEPOINT live")
+            try:
+                write_live_player_games(cursor, player_game_rows)
+            except Exception:
+                cursor.execute("ROLLBACK TO SAVEPOINT live")
+                raise
+            cursor.execute("RELEASE SAVEPOINT live")
+        finally:
+            cursor.close()
+        self._commit(session)
+
+    def _commit(self, session, triggered=False):
+        """
+        Commit the session's batch. With `triggered` the last game of the batch is the one
+        being written, which hears about a failure from the raised error.
+        """
+        games = session["games"]
+        session["games"] = []
+        metrics = get_metrics()
+        try:
+            with metrics.timer("db_statement_seconds", writer="postgres", group="commit"):
+                session["conn"].commit()
+        except psycopg2.Error as e:
+            if not session["conn"].closed:
+                session["conn"].rollback()
+            _batch_failed(games[:-1] if triggered else games, e)
+            raise
+        if games:
+            metrics.inc("games_total", len(games), outcome="written")
+            metrics.set("ingest_last_game_timestamp_seconds", time.time())
+        for on_commit, _ in games:
+            if on_commit is not None:
+                on_commit()
+
+    def flush(self):
+        """
+        Commit the games written by the current thread.
+        """
+        self._commit(self._session())
+
+    def close(self):
+        """
+        Commit every open batch and return the connections to the pool.
+        """
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        error = None
+        try:
+            for session in sessions:
+                try:
+                    self._commit(session)
+                except psycopg2.Error as e:
+                    # Its games were reported to their on_failure callbacks; commit the other batches
+                    error = error or e
+        finally:
+            for session in sessions:
+                self.pool.putconn(session["conn"])
+            self.pool.closeall()
+        if error is not None:
+            raise error
@@ -1,84 +1,94 @@
 import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from metrics import get_metrics
+from migrations import migrate_sqlite
+
+PLAYER_SUM_COLUMNS = (
+    "sum_points", "sum_one_pointers", "sum_two_pointers", "sum_three_pointers",
+    "sum_fouls", "sum_minutes", "sum_plus_minus",
+)
+
+# Settings of the long-lived SqliteWriter connection. WAL lets readers work during a load, and
+# with WAL synchronous=NORMAL only risks the last transactions on power loss, never corruption
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+)
+
+# Databases already migrated by this process
+_initialized = set()
 
 def initialize_database(db_path: str):
     """
-    Initialize the SQLite database by creating necessary tables if they do not exist.
+    Bring the SQLite database up to the latest schema version (see migrations.py), once per process.
     """
+    if db_path in _initialized:
+        return
     conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    try:
+        migrate_sqlite(conn)
+    finally:
+        conn.close()
+    _initialized.add(db_path)
 
-    # Create tables
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS Games (
-            game_guid TEXT PRIMARY KEY,
-            home_team_guid TEXT NOT NULL,
-            home_team_name TEXT NOT NULL,
-            away_team_guid TEXT NOT NULL,
-            away_team_name TEXT NOT NULL,
-            date TEXT NOT NULL,
-            poule_guid TEXT NOT NULL,
-            poule_name TEXT NOT NULL,
-            played TEXT NOT NULL,
-            score TEXT NOT NULL,
-            start_time TEXT NOT NULL
-        );
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS Players (
-            player_guid TEXT PRIMARY KEY,
-            name TEXT,
-            total_games INTEGER DEFAULT 0,
-            avg_points REAL DEFAULT 0,
-            avg_one_pointers REAL DEFAULT 0,
-            avg_two_pointers REAL DEFAULT 0,
-            avg_three_pointers REAL DEFAULT 0,
-            avg_fouls REAL DEFAULT 0,
-            avg_minutes REAL DEFAULT 0,
-            avg_plus_minus REAL DEFAULT 0
-        );
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS PlayerGames (
-            player_guid TEXT NOT NULL,
-            game_guid TEXT NOT NULL,
-            team_guid TEXT NOT NULL,
-            total_points INTEGER DEFAULT 0,
-            one_pointers INTEGER DEFAULT 0,
-            two_pointers INTEGER DEFAULT 0,
-            three_pointers INTEGER DEFAULT 0,
-            fouls INTEGER DEFAULT 0,
-            total_minutes INTEGER DEFAULT 0,
-            plus_minus INTEGER DEFAULT 0,
-            PRIMARY KEY (player_guid, game_guid),
-            FOREIGN KEY (player_guid) REFERENCES Players(player_guid),
-            FOREIGN KEY (game_guid) REFERENCES Games(game_guid)
-        );
-    """)
 
+def rebuild_player_aggregates(cursor):
+    """
+    Recompute every player's games, sums and averages from PlayerGames.
+    """
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS Quarters (
-            game_guid TEXT NOT NULL,
-            team_guid TEXT NOT NULL,
-            quarter INTEGER NOT NULL,
-            total_points INTEGER DEFAULT 0,
-            one_pointers INTEGER DEFAULT 0,
-            two_pointers INTEGER DEFAULT 0,
-            three_pointers INTEGER DEFAULT 0,
-            fouls INTEGER DEFAULT 0,
-            PRIMARY KEY (game_guid, team_guid, quarter),
-            FOREIGN KEY (game_guid) REFERENCES Games(game_guid)
-        );
+        UPDATE Players SET
+            total_games = a.games,
+            sum_points = a.sum_points,
+            sum_one_pointers = a.sum_one_pointers,
+            sum_two_pointers = a.sum_two_pointers,
+            sum_three_pointers = a.sum_three_pointers,
+            sum_fouls = a.sum_fouls,
+            sum_minutes = a.sum_minutes,
+            sum_plus_minus = a.sum_plus_minus,
+            avg_points = CAST(a.sum_points AS REAL) / a.games,
+            avg_one_pointers = CAST(a.sum_one_pointers AS REAL) / a.games,
+            avg_two_pointers = CAST(a.sum_two_pointers AS REAL) / a.games,
+            avg_three_pointers = CAST(a.sum_three_pointers AS REAL) / a.games,
+            avg_fouls = CAST(a.sum_fouls AS REAL) / a.games,
+            avg_minutes = CAST(a.sum_minutes AS REAL) / a.games,
+            avg_plus_minus = CAST(a.sum_plus_minus AS REAL) / a.games
+        FROM (
+            SELECT
+                player_guid,
+                COUNT(*) AS games,
+                SUM(total_points) AS sum_points,
+                SUM(one_pointers) AS sum_one_pointers,
+                SUM(two_pointers) AS sum_two_pointers,
+                SUM(three_pointers) AS sum_three_pointers,
+                SUM(fouls) AS sum_fouls,
+                SUM(total_minutes) AS sum_minutes,
+                SUM(plus_minus) AS sum_plus_minus
+            FROM PlayerGames
+            GROUP BY player_guid
+        ) AS a
+        WHERE Players.player_guid = a.player_guid
     """)
-    conn.commit()
-    conn.close()
 
 
-def write_to_sqlite(game_players, game_events, game_details, db_path):
-    
-    initialize_database(db_path)
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+def game_date(date_string):
+    """
+    ISO date (yyyy-mm-dd) of a datumString ("dd-mm-yyyy"), or None.
+    """
+    try:
+        return datetime.strptime(date_string, "%d-%m-%Y").date().isoformat()
+    except ValueError:
+        return None
+
 
+def write_game(cursor, game_players, game_events, game_details):
+    """
+    Insert one game with its players on the given cursor, without committing.
+    """
     game_events.teamThuisGUID = game_details.get("teamThuisGUID", "")
     game_events.teamThuisNaam = game_details.get("teamThuisNaam", "")
     game_events.teamUitGUID = game_details.get("teamUitGUID", "")
@@ -91,153 +101,230 @@ def write_to_sqlite(game_players, game_events, game_details, db_path):
     game_events.beginTijd = game_details.get("beginTijd", "")
     game_events.guid = game_details.get("guid", "")
 
-    try:
-        # Existing game data insertion
-        game_guid = game_events.guid
+    metrics = get_metrics()
+    game_guid = game_events.guid
+    with metrics.timer("db_statement_seconds", writer="sqlite", group="games"):
         cursor.execute("""
             INSERT INTO Games (
                 game_guid, home_team_guid, home_team_name, away_team_guid, away_team_name, date, poule_guid, poule_name, played, score, start_time
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (game_guid) DO NOTHING
         """, (
             game_guid,
             game_events.teamThuisGUID,
             game_events.teamThuisNaam,
             game_events.teamUitGUID,
             game_events.teamUitNaam,
-            game_events.datumString,
+            game_date(game_events.datumString),
             game_events.pouleGUID,
             game_events.pouleNaam,
             game_events.gespeeld,
             game_events.uitslag.replace(" ", ""),
             game_events.beginTijd.replace(".", ":"),
         ))
+    if cursor.rowcount == 0:
+        # Games are written atomically, so one that is already stored is complete; writing
+        # it again would count its players twice
+        return
+    metrics.inc("db_rows_total", writer="sqlite", group="games")
+
+    # Quarter statistics for both teams were accumulated while parsing
+    quarter_rows = [(game_guid,) + row for row in game_events.quarter_rows()]
+    with metrics.timer("db_statement_seconds", writer="sqlite", group="quarters"):
+        cursor.executemany("""
+            INSERT INTO Quarters (
+                game_guid, team_guid, quarter, total_points, one_pointers,
+                two_pointers, three_pointers, fouls
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, quarter_rows)
+    metrics.inc("db_rows_total", len(quarter_rows), writer="sqlite", group="quarters")
 
-        # Process both teams' quarter statistics
-        teams_data = [
-            (game_events.teamThuisGUID, game_events.homeTeam),
-            (game_events.teamUitGUID, game_events.awayTeam)
-        ]
-
-        for team_guid, team_stats in teams_data:
-            # Initialize quarter stats for quarters 1-4
-            quarter_stats = {
-                1: {'total_points': 0, 'one_pointers': 0, 'two_pointers': 0, 'three_pointers': 0, 'fouls': 0},
-                2: {'total_points': 0, 'one_pointers': 0, 'two_pointers': 0, 'three_pointers': 0, 'fouls': 0},
-                3: {'total_points': 0, 'one_pointers': 0, 'two_pointers': 0, 'three_pointers': 0, 'fouls': 0},
-                4: {'total_points': 0, 'one_pointers': 0, 'two_pointers': 0, 'three_pointers': 0, 'fouls': 0}
-            }
-
-            # Aggregate stats from all players for each quarter
-            for player in team_stats.players.values():
-                for quarter, stats in player.quarters.items():
-                    # Only process quarters 1-4
-                    if quarter not in range(1, 5):
-                        continue
-                        
-                    quarter_stats[quarter]['total_points'] += stats.get('totalPoints', 0)
-                    quarter_stats[quarter]['one_pointers'] += stats.get('onePointers', 0)
-                    quarter_stats[quarter]['two_pointers'] += stats.get('twoPointers', 0)
-                    quarter_stats[quarter]['three_pointers'] += stats.get('threePointers', 0)
-                    quarter_stats[quarter]['fouls'] += stats.get('fouls', 0)
-
-            # Insert quarter statistics for each quarter
-            for quarter in range(1, 5):  # Explicitly handle quarters 1-4
-                stats = quarter_stats[quarter]
-                cursor.execute("""
-                    INSERT INTO Quarters (
-                        game_guid, team_guid, quarter, total_points, one_pointers,
-                        two_pointers, three_pointers, fouls
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    game_guid,
-                    team_guid,
-                    quarter,
-                    stats['total_points'],
-                    stats['one_pointers'],
-                    stats['two_pointers'],
-                    stats['three_pointers'],
-                    stats['fouls']
-                ))
-
-        # Process player details and update player averages
-        detail_lookup = {detail["RelGUID"]: detail for detail in game_players["TtDeel"] + game_players["TuDeel"]}
-        cursor.execute("SELECT player_guid, total_games, avg_points, avg_one_pointers, avg_two_pointers, avg_three_pointers, avg_fouls, avg_minutes, avg_plus_minus FROM Players")
-        existing_players = {row[0]: row[1:] for row in cursor.fetchall()}
-
-        # Handle player statistics (rest of the existing code)
-        teams = {"homeTeam": game_events.homeTeam, "awayTeam": game_events.awayTeam}
-        team_guids = {"homeTeam": game_events.teamThuisGUID, "awayTeam": game_events.teamUitGUID}
-
-        for team_name, team_stats in teams.items():
-            team_guid = team_guids[team_name]
-
-            for player_id, player_stats in team_stats.players.items():
-                player_guid = player_stats.RelGUID
-                player_name = detail_lookup.get(player_guid, {}).get("Naam", "Unknown")
-
-                if player_guid in existing_players:
-                    # Update averages
-                    total_games, avg_points, avg_one_pointers, avg_two_pointers, avg_three_pointers, avg_fouls, avg_minutes, avg_plus_minus = existing_players[player_guid]
-                    total_games += 1
-
-                    updated_values = {
-                        "avg_points": round((avg_points * (total_games - 1) + player_stats.totalPoints) / total_games, 1),
-                        "avg_one_pointers": round((avg_one_pointers * (total_games - 1) + player_stats.onePointers) / total_games, 1),
-                        "avg_two_pointers": round((avg_two_pointers * (total_games - 1) + player_stats.twoPointers) / total_games, 1),
-                        "avg_three_pointers": round((avg_three_pointers * (total_games - 1) + player_stats.threePointers) / total_games, 1),
-                        "avg_fouls": round((avg_fouls * (total_games - 1) + player_stats.fouls) / total_games, 1),
-                        "avg_minutes": round((avg_minutes * (total_games - 1) + player_stats.totalMinutesPlayed) / total_games, 1),
-                        "avg_plus_minus": round((avg_plus_minus * (total_games - 1) + player_stats.plusMinus) / total_games, 1),
-                    }
-
-                    cursor.execute("""
-                        UPDATE Players SET
-                            total_games = ?, avg_points = ?, avg_one_pointers = ?, avg_two_pointers = ?,
-                            avg_three_pointers = ?, avg_fouls = ?, avg_minutes = ?, avg_plus_minus = ?
-                        WHERE player_guid = ?
-                    """, (
-                        total_games,
-                        updated_values["avg_points"],
-                        updated_values["avg_one_pointers"],
-                        updated_values["avg_two_pointers"],
-                        updated_values["avg_three_pointers"],
-                        updated_values["avg_fouls"],
-                        updated_values["avg_minutes"],
-                        updated_values["avg_plus_minus"],
-                        player_guid,
-                    ))
-                else:
-                    # Insert new player
-                    cursor.execute("""
-                        INSERT INTO Players (
-                            player_guid, name, total_games, avg_points, avg_one_pointers, avg_two_pointers,
-                            avg_three_pointers, avg_fouls, avg_minutes, avg_plus_minus
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        player_guid, player_name, 1,
-                        player_stats.totalPoints, player_stats.onePointers, player_stats.twoPointers,
-                        player_stats.threePointers, player_stats.fouls, player_stats.totalMinutesPlayed,
-                        player_stats.plusMinus,
-                    ))
-
-                # Insert player game stats
-                cursor.execute("""
-                    INSERT INTO PlayerGames (
-                        player_guid, game_guid, team_guid, total_points, one_pointers, two_pointers, three_pointers,
-                        fouls, total_minutes, plus_minus
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    player_guid, game_guid, team_guid,
-                    player_stats.totalPoints, player_stats.onePointers, player_stats.twoPointers,
-                    player_stats.threePointers, player_stats.fouls, player_stats.totalMinutesPlayed,
-                    player_stats.plusMinus,
-                ))
-
-        conn.commit()
+    # Lineup stints; SQLite has no arrays, so only the comma-joined lineup is kept
+    stint_rows = [(game_guid,) + row[:6] + row[7:] for row in game_events.stint_rows()]
+    with metrics.timer("db_statement_seconds", writer="sqlite", group="stints"):
+        cursor.executemany("""
+            INSERT INTO Stints (
+                game_guid, team_guid, stint, quarter, start_minute, end_minute,
+                lineup, points_for, points_against
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, stint_rows)
+    metrics.inc("db_rows_total", len(stint_rows), writer="sqlite", group="stints")
+
+    # Only the roster entries of this game are looked at
+    detail_lookup = {detail["RelGUID"]: detail for detail in game_players["TtDeel"] + game_players["TuDeel"]}
+
+    player_rows = []
+    player_game_rows = []
+    for team_guid, team_stats in ((game_events.teamThuisGUID, game_events.homeTeam),
+                                  (game_events.teamUitGUID, game_events.awayTeam)):
+        for player_stats in team_stats.players.values():
+            player_guid = player_stats.RelGUID
+            detail = detail_lookup.get(player_guid, {})
+
+            birthdate_string = detail.get("GebDat", None)
+            try:
+                player_birthdate = datetime.strptime(birthdate_string.split(" ")[0], "%d-%m-%Y").date().isoformat() if birthdate_string else None
+            except ValueError:
+                player_birthdate = None
+
+            stats = (
+                player_stats.totalPoints, player_stats.onePointers, player_stats.twoPointers,
+                player_stats.threePointers, player_stats.fouls, player_stats.totalMinutesPlayed,
+                player_stats.plusMinus,
+            )
+            player_rows.append((player_guid, detail.get("Naam", "Unknown"), player_birthdate) + stats + stats)
+            player_game_rows.append((player_guid, game_guid, team_guid) + stats)
+
+    with metrics.timer("db_statement_seconds", writer="sqlite", group="players"):
+        # Keep exact sums and derive the averages from them, in one atomic upsert
+        cursor.executemany("""
+            INSERT INTO Players (
+                player_guid, name, birthdate, total_games, sum_points, sum_one_pointers, sum_two_pointers,
+                sum_three_pointers, sum_fouls, sum_minutes, sum_plus_minus, avg_points, avg_one_pointers,
+                avg_two_pointers, avg_three_pointers, avg_fouls, avg_minutes, avg_plus_minus
+            ) VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (player_guid) DO UPDATE SET
+                birthdate = COALESCE(birthdate, excluded.birthdate),
+                total_games = total_games + 1,
+                sum_points = sum_points + excluded.sum_points,
+                sum_one_pointers = sum_one_pointers + excluded.sum_one_pointers,
+                sum_two_pointers = sum_two_pointers + excluded.sum_two_pointers,
+                sum_three_pointers = sum_three_pointers + excluded.sum_three_pointers,
+                sum_fouls = sum_fouls + excluded.sum_fouls,
+                sum_minutes = sum_minutes + excluded.sum_minutes,
+                sum_plus_minus = sum_plus_minus + excluded.sum_plus_minus,
+                avg_points = CAST(sum_points + excluded.sum_points AS REAL) / (total_games + 1),
+                avg_one_pointers = CAST(sum_one_pointers + excluded.sum_one_pointers AS REAL) / (total_games + 1),
+                avg_two_pointers = CAST(sum_two_pointers + excluded.sum_two_pointers AS REAL) / (total_games + 1),
+                avg_three_pointers = CAST(sum_three_pointers + excluded.sum_three_pointers AS REAL) / (total_games + 1),
+                avg_fouls = CAST(sum_fouls + excluded.sum_fouls AS REAL) / (total_games + 1),
+                avg_minutes = CAST(sum_minutes + excluded.sum_minutes AS REAL) / (total_games + 1),
+                avg_plus_minus = CAST(sum_plus_minus + excluded.sum_plus_minus AS REAL) / (total_games + 1)
+        """, player_rows)
+
+        # Insert player game stats
+        cursor.executemany("""
+            INSERT INTO PlayerGames (
+                player_guid, game_guid, team_guid, total_points, one_pointers, two_pointers, three_pointers,
+                fouls, total_minutes, plus_minus
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, player_game_rows)
+    metrics.inc("db_rows_total", len(player_rows) + len(player_game_rows), writer="sqlite", group="players")
+
+
+def write_to_sqlite(game_players, game_events, game_details, db_path):
+    """
+    Write one game on its own connection and commit it. SqliteWriter is much faster for many games.
+    """
+    initialize_database(db_path)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    metrics = get_metrics()
+
+    try:
+        write_game(cursor, game_players, game_events, game_details)
+        with metrics.timer("db_statement_seconds", writer="sqlite", group="commit"):
+            conn.commit()
+        metrics.inc("games_total", outcome="written")
+        metrics.set("ingest_last_game_timestamp_seconds", time.time())
 
     except sqlite3.Error as e:
         print(f"Database error: {e}")
         raise
 
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+
+class SqliteWriter:
+    """
+    Batch writer for loading many games into SQLite on one long-lived connection.
+
+    The database is opened in WAL mode with `synchronous=NORMAL` and a large page cache, and
+    every `batch_size` games share a transaction. Each game is written inside a savepoint, so a
+    failing game is rolled back on its own. The writer can be shared by threads; their writes
+    are serialized, as SQLite allows one writer at a time anyway. `on_commit` callbacks passed
+    to `write` run once the game is committed. When a batch can't be committed, the `on_failure`
+    callbacks of its games are called with the error; the game whose write triggered the commit
+    gets the error raised instead.
+    """
+    def __init__(self, db_path: str, batch_size=500, cache_mb=64):
+        initialize_database(db_path)
+        self.batch_size = batch_size
+        # Transactions are managed explicitly, hence isolation_level=None
+        self.conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        for pragma in SQLITE_PRAGMAS:
+            self.conn.execute(pragma)
+        self.conn.execute(f"PRAGMA cache_size = {-cache_mb * 1024}")
+        self.games = []
+        self._lock = threading.Lock()
+
+    def write(self, game_players, game_events, game_details, on_commit=None, raw_events=None, on_failure=None):
+        # Raw events are only kept in PostgreSQL
+        with self._lock:
+            cursor = self.conn.cursor()
+            try:
+                if not self.conn.in_transaction:
+                    cursor.execute("BEGIN")
+                cursor.execute("SAVEPOINT game")
+                try:
+                    write_game(cursor, game_players, game_events, game_details)
+                except Exception:
+                    cursor.execute("ROLLBACK TO SAVEPOINT game")
+                    cursor.execute("RELEASE SAVEPOINT game")
+                    raise
+                cursor.execute("RELEASE SAVEPOINT game")
+            except sqlite3.Error as e:
+                print(f"Database error: {e}")
+                raise
+            finally:
+                cursor.close()
+
+            self.games.append((on_commit, on_failure))
+            if len(self.games) >= self.batch_size:
+                self._commit(triggered=True)
+
+    def _commit(self, triggered=False):
+        """
+        Commit the open batch. With `triggered` the last game of the batch is the one being
+        written, which hears about a failure from the raised error.
+        """
+        games, self.games = self.games, []
+        if not self.conn.in_transaction:
+            return
+        metrics = get_metrics()
+        try:
+            with metrics.timer("db_statement_seconds", writer="sqlite", group="commit"):
+                self.conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if self.conn.in_transaction:
+                self.conn.execute("ROLLBACK")
+            failed = games[:-1] if triggered else games
+            if failed:
+                print(f"{len(failed)} games of a batch were not committed: {e}")
+            for _, on_failure in failed:
+                if on_failure is not None:
+                    on_failure(e)
+            raise
+        if games:
+            metrics.inc("games_total", len(games), outcome="written")
+            metrics.set("ingest_last_game_timestamp_seconds", time.time())
+        for on_commit, _ in games:
+            if on_commit is not None:
+                on_commit()
+
+    def flush(self):
+        """
+        Commit the games written so far.
+        """
+        with self._lock:
+            self._commit()
+
+    def close(self):
+        """
+        Commit the open batch and close the connection.
+        """
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
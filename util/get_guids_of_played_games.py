@@ -1,18 +1,20 @@
-import requests
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from vbl_client import fetch_region_listing, iter_region_matches
 
 REGIONS = ["BVBL9180", "BVBL9100", "BVBL9110", "BVBL9120", "BVBL9130", "BVBL9140", "BVBL9150", "BVBL9170", "BVBL9160"]
 
 def check_games(region):
-    url = f"https://vblcb.wisseq.eu/VBLCB_WebService/data/MatchesByRegioPeriode?curRegio={region}&dtStart=0&dtEnd=999999999999999999"
-    response = requests.get(url)
-    response.raise_for_status()
-    data = response.json()
-    for game in data:
-        if game["uitslag"] != "":
+    # The full-season listing is decoded one match at a time so memory stays flat
+    response = fetch_region_listing(region, 0, 999999999999999999, stream=True)
+    for game in iter_region_matches(response):
+        if game["uitslag"]:
             print(game["guid"])
 
 
 
 if __name__ == "__main__":
     for region in REGIONS:
-        check_games(region)
\ No newline at end of file
+        check_games(region)
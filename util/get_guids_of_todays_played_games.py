@@ -1,28 +1,27 @@
-import requests
+import os
+import sys
 import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from ledger import get_ledger
+from vbl_client import fetch_region_listing, iter_region_matches
+
 REGIONS = ["BVBL9180", "BVBL9100", "BVBL9110", "BVBL9120", "BVBL9130", "BVBL9140", "BVBL9150", "BVBL9170", "BVBL9160"]
 today = datetime.datetime.now().strftime("%d-%m-%Y")
 
 def check_games(region):
-    url = f"https://vblcb.wisseq.eu/VBLCB_WebService/data/MatchesByRegioPeriode?curRegio={region}&dtStart=0&dtEnd=999999999999999999"
-    response = requests.get(url)
-    response.raise_for_status()
-    data = response.json()
-    games = []
-    for game in data:
-        with open("played_games.txt", "r") as f:
-            played_games = f.read().splitlines()
-            if game["uitslag"] != "" and game["datumString"] == today and not game["guid"] in played_games:
-                games.append(game["guid"])
-    return games
+    response = fetch_region_listing(region, 0, 999999999999999999, stream=True)
+    games = iter_region_matches(response, fields=("guid", "uitslag", "datumString"))
+    return [game["guid"] for game in games if game["uitslag"] and game["datumString"] == today]
 
 def get_todays_played_game_guids():
-    result = []
+    finished = []
     for region in REGIONS:
         games = check_games(region)
-        result.extend(games)
-    return result
+        finished.extend(games)
+    runnable = get_ledger().runnable(finished)
+    return [guid for guid in finished if guid in runnable]
 
 if __name__ == "__main__":
-    get_todays_played_game_guids()
+    for guid in get_todays_played_game_guids():
+        print(guid)